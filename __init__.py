@@ -31,18 +31,47 @@ bl_info = {
 
 
 import bpy
+import csv
+import fnmatch
+import json
 import os
-from bpy_extras.io_utils import ImportHelper
+import sqlite3
+import time
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ImportHelper, ExportHelper
 from . import addon_updater_ops
+from .profiler import reload_profiler
+from .manifest_cache import ManifestCache, file_signature
+from .search_index import NameIndex
+from . import blendfile
+from .file_stats import file_stats, library_watcher, format_size, tag_redraw
+from .instrumentation import hot_path_stats
+from .remap import RemapRules, plan_remap
 
 '''
 TODO:
     Clicking on datablocks should do something (select object, go to material, particle settings, etc...)
-    Avoid iterating over all objects on every redraw (maybe)
-    Maybe make list into a bit of a heirarchy? Nest materials & mesh data under the objects they belong to...
 '''
 
 
+class LibrarianRemapRule(bpy.types.PropertyGroup):
+    enabled: bpy.props.BoolProperty(name="Enabled", description="Apply this rule", default=True)
+    kind: bpy.props.EnumProperty(
+        name="Kind",
+        description="How the pattern is matched",
+        items=(
+            ('PREFIX', "Prefix", "Replace the start of the path", 'TRIA_RIGHT_BAR', 0),
+            ('REGEX', "Regular Expression", "Substitute the first match of a regular expression", 'SORTBYEXT', 1),
+            ),
+        default='PREFIX',
+        )
+    pattern: bpy.props.StringProperty(name="Find", description="Start of the path, or regular expression to find")
+    replacement: bpy.props.StringProperty(
+        name="Replace",
+        description="What the matched part is replaced by. Regular expressions can refer to groups with \\1 etc.",
+        )
+
+
 class LibrarianPrefs(bpy.types.AddonPreferences):
     bl_idname = __package__
 
@@ -80,26 +109,257 @@ class LibrarianPrefs(bpy.types.AddonPreferences):
         )
     updater_expand_prefs: bpy.props.BoolProperty(default=False)
 
+    page_size: bpy.props.IntProperty(
+        name="Datablocks per Page",
+        description="How many datablocks of an expanded library are listed at once",
+        default=50,
+        min=5,
+        )
+
+    huge_library_size: bpy.props.IntProperty(
+        name="Large Library Size (MB)",
+        description="Libraries whose file is bigger than this are highlighted in the panel",
+        default=500,
+        min=1,
+        )
+
+    remap_rules: bpy.props.CollectionProperty(type=LibrarianRemapRule)  # Tried in order, the first match wins
+
+    def update_watch_interval(self, context):
+        library_watcher.interval = self.watch_interval
+
+    watch_interval: bpy.props.FloatProperty(
+        name="Check Libraries Every (s)",
+        description="Seconds between checking a batch of library files for changes made since they were loaded",
+        default=5.0,
+        min=0.5,
+        update=update_watch_interval,
+        )
+
+    def update_snapshot_interval(self, context):
+        snapshot_state['interval'] = self.snapshot_interval / 1000
+
+    snapshot_interval: bpy.props.IntProperty(
+        name="Panel Refresh Interval (ms)",
+        description="Changes to the linked data are picked up by the panel at most this often, "
+                    "however often the scene is redrawn or edited",
+        default=250,
+        min=0,
+        update=update_snapshot_interval,
+        )
+
+    show_stats: bpy.props.BoolProperty(
+        name="Show Draw Statistics",
+        description="Add a section to the panel with timings of its drawing and of scanning the linked data",
+        default=False,
+        )
+
     def draw(self, context):
         layout=self.layout
+        layout.prop(self, 'snapshot_interval')
+        layout.prop(self, 'page_size')
+        layout.prop(self, 'huge_library_size')
+        layout.prop(self, 'watch_interval')
+        layout.prop(self, 'show_stats')
         addon_updater_ops.update_settings_ui(self, context)
 
 
+class LibrarianLibrary(bpy.types.PropertyGroup):
+    # name: name of the library this state belongs to
+    expanded: bpy.props.BoolProperty()  # Whether the datablocks of this library are shown
+    page: bpy.props.IntProperty(min=0)  # Page of the datablock list that is shown
+
+
 class LibrarianSettings(bpy.types.PropertyGroup):
-    expanded: bpy.props.StringProperty()  # Used to keep track of which libs are expanded
+    libraries: bpy.props.CollectionProperty(type=LibrarianLibrary)  # UI state of each library, keyed by name
+    filter_text: bpy.props.StringProperty(
+        name="Filter",
+        description="Only list datablocks whose name contains this text",
+        options={'TEXTEDIT_UPDATE'},
+        )
+    sort_mode: bpy.props.EnumProperty(
+        name="Sort",
+        description="Order of the listed datablocks",
+        items=(
+            ('TYPE', "Type", "Group datablocks by their type", 'FILTER', 0),
+            ('NAME', "Name", "Sort datablocks alphabetically", 'SORTALPHA', 1),
+            ),
+        default='TYPE',
+        )
+    search: bpy.props.StringProperty(
+        name="Search",
+        description="Find linked datablocks by name across all libraries",
+        options={'TEXTEDIT_UPDATE'},
+        )
+    show_profile: bpy.props.BoolProperty(name="Reload Timings", description="Show how long each library took to reload")
+    show_stats: bpy.props.BoolProperty(name="Draw Statistics", description="Show how long drawing this panel takes")
+    show_remap: bpy.props.BoolProperty(name="Remap Library Paths",
+                                       description="Rewrite the paths of many libraries at once, e.g. after moving files")
+    view_mode: bpy.props.EnumProperty(
+        name="View",
+        description="How the datablocks of each library are listed",
+        items=(
+            ('LIST', "List", "List all datablocks", 'ALIGN_JUSTIFY', 0),
+            ('TREE', "Hierarchy", "Nest datablocks under the ones using them, e.g. materials under meshes", 'OUTLINER', 1),
+            ),
+        default='LIST',
+        )
+
+    def update_scene_only(self, context):
+        if self.scene_only:
+            find_scene_usage(context.evaluated_depsgraph_get())  # Afterwards, snapshot_timer() keeps it current
+
+    scene_only: bpy.props.BoolProperty(
+        name="Used by Scene",
+        description="Only list the datablocks that the active scene and view layer use, "
+                    "and show how many of each library's datablocks that is",
+        update=update_scene_only,
+        )
 
 
 #####  Functions  #####
+class IDCollection():
+    """ A bpy.data collection that holds datablocks, e.g. bpy.data.objects """
+
+    def __init__(self, attr, id_type, name, icon):
+        self.attr = attr  # Attribute name on bpy.data
+        self.id_type = id_type  # RNA identifier of the datablocks it holds, e.g. 'Object'
+        self.name = name  # UI name of that type, e.g. 'Object'
+        self.icon = icon
+
+
+id_registry = {
+    'version': None,  # bpy.app.version the registry was built for
+    'collections': [],
+    'by_type': {},  # RNA identifier of the type a collection holds -> its attribute name on bpy.data
+}
+
+
+def build_id_registry():
+    """ Find the bpy.data collections holding datablocks through RNA once, instead of probing dir(bpy.data) """
+    collections = []
+    for prop in bpy.types.BlendData.bl_rna.properties:
+        if prop.type != 'COLLECTION' or prop.identifier == 'libraries':
+            continue
+        base = prop.fixed_type
+        while base is not None and base.identifier != 'ID':
+            base = base.base
+        if base is None:
+            continue
+        collections.append(IDCollection(prop.identifier,
+                                        prop.fixed_type.identifier,
+                                        prop.fixed_type.name,
+                                        type_icon(prop.fixed_type.identifier)))
+
+    id_registry['version'] = tuple(bpy.app.version)
+    id_registry['collections'] = collections
+    id_registry['by_type'] = {coll.id_type: coll.attr for coll in collections}
+
+
+def id_collections():
+    """ The registered datablock collections, rebuilt if the Blender version changed since registration """
+    if id_registry['version'] != tuple(bpy.app.version):
+        build_id_types()
+        build_id_registry()
+    return id_registry['collections']
+
+
+def id_collection_attr(id_data):
+    """ Attribute name of the bpy.data collection holding a datablock, e.g. 'node_groups' for a ShaderNodeTree """
+    id_collections()
+    by_type = id_registry['by_type']
+    rna = id_data.bl_rna
+    while rna is not None:
+        attr = by_type.get(rna.identifier)
+        if attr is not None:
+            return attr
+        rna = rna.base
+    return None
+
+
 def get_linked_data():
-    # Warning: Gets run for every redraw
-    type_iter = type(bpy.data.objects)
+    for coll in id_collections():
+        for id_data in getattr(bpy.data, coll.attr):
+            if id_data.library:
+                yield id_data
+
+
+def linked_data_report(direct_only=False):
+    """ The libraries of the open file and the datablocks linked from each, in a form that can be saved as JSON.
+        With direct_only set, only the libraries the file itself links are included, like blendfile.read_links() """
+    libraries = {lib.name: {
+        'name': lib.name,
+        'filepath': lib.filepath,
+        'abspath': library_abspath(lib),
+        'indirect': lib.parent is not None,
+        'ids': [],
+    } for lib in bpy.data.libraries if not (direct_only and lib.parent is not None)}
+
+    for coll in id_collections():
+        for id_data in getattr(bpy.data, coll.attr):
+            lib = id_data.library
+            if lib and lib.name in libraries:
+                libraries[lib.name]['ids'].append({'type': coll.id_type, 'name': id_data.name})
+
+    return {
+        'file': bpy.data.filepath,
+        'libraries': list(libraries.values()),
+    }
 
-    for attr in dir(bpy.data):
-        data_iter = getattr(bpy.data, attr, None)
-        if type(data_iter) == type_iter:
-            for id_data in data_iter:
-                if id_data.library:
-                    yield id_data
+
+def library_footprint(libraries):
+    """ Geometry and texture memory each library brings in: library name -> {'meshes', 'vertices', 'faces',
+        'images', 'image_bytes'}. Images are only counted when their pixels are loaded, since asking an unloaded
+        image for its size or depth would load it from disk """
+    import numpy as np
+
+    lib_names = list(libraries)
+    lib_index = {name: i for i, name in enumerate(lib_names)}
+    num_libs = len(lib_names)
+
+    # Meshes: gather the counts into arrays and sum them per library in one go
+    mesh_libs = []
+    vertices = []
+    faces = []
+    for me in bpy.data.meshes:
+        if me.library:
+            mesh_libs.append(lib_index.get(me.library.name, -1))
+            vertices.append(len(me.vertices))
+            faces.append(len(me.polygons))
+    mesh_libs = np.array(mesh_libs, dtype=np.int64)
+    valid = mesh_libs >= 0
+    mesh_counts = np.bincount(mesh_libs[valid], minlength=num_libs)
+    vertex_counts = np.bincount(mesh_libs[valid], weights=np.array(vertices, dtype=np.float64)[valid], minlength=num_libs)
+    face_counts = np.bincount(mesh_libs[valid], weights=np.array(faces, dtype=np.float64)[valid], minlength=num_libs)
+
+    # Images: one foreach_get tells which have pixels loaded, only those are asked for their size and depth
+    images = bpy.data.images
+    has_data = np.zeros(len(images), dtype=bool)
+    images.foreach_get('has_data', has_data)
+    image_libs = []
+    image_bytes = []
+    for i in np.flatnonzero(has_data):
+        img = images[int(i)]
+        if img.library and img.library.name in lib_index:
+            width, height = img.size
+            image_libs.append(lib_index[img.library.name])
+            image_bytes.append(width * height * img.depth / 8)
+    image_libs = np.array(image_libs, dtype=np.int64)
+    image_counts = np.bincount(image_libs, minlength=num_libs)
+    byte_counts = np.bincount(image_libs, weights=np.array(image_bytes, dtype=np.float64), minlength=num_libs)
+
+    return {name: {
+        'meshes': int(mesh_counts[i]),
+        'vertices': int(vertex_counts[i]),
+        'faces': int(face_counts[i]),
+        'images': int(image_counts[i]),
+        'image_bytes': int(byte_counts[i]),
+    } for i, name in enumerate(lib_names)}
+
+
+def library_abspath(lib):
+    """ Absolute path of a library file. Paths of indirect libraries are relative to the library linking them """
+    return os.path.normpath(bpy.path.abspath(lib.filepath, library=lib.parent))
 
 
 def count_type(data, rna_type):
@@ -110,70 +370,742 @@ def count_type(data, rna_type):
     return c
 
 
-def count_types(data):
-    rna_types = {}
-    for d in data:
-        t = d.rna_type.name
-
-        if 'Node Tree' in t:
-            t = 'Node Tree'
-        elif 'Lamp' in t:
-            t = 'Lamp'
-        elif 'Texture' in t:
-            t = 'Texture'
-
-        if t in rna_types:
-            rna_types[t] += 1
-        else:
-            rna_types[t] = 1
-    return rna_types
-
-
-def type_icon(t):
-
-    # Special cases:
-    if "Node Tree" in t:
-        return "NODETREE"  # Shader/Composite etc have different types, but all include "Node Tree"
-    elif "Lamp" in t:
-        return "LAMP"  # Point/Sun etc have different types, but all include "Lamp"
-    elif "Texture" in t:
-        return "TEXTURE"  # Image/Cloud etc have different types, but all include "Texture"
-
-    d = {
+ID_TYPE_ICONS = {
+    # RNA identifier -> icon. Subtypes that aren't listed (e.g. ShaderNodeTree, ImageTexture, PointLight)
+    # use the icon of the nearest listed base type.
     'Action': 'ACTION',
+    'Annotation': 'OUTLINER_DATA_GREASEPENCIL',
     'Armature': 'ARMATURE_DATA',
     'Brush': 'BRUSH_DATA',
+    'CacheFile': 'FILE_CACHE',
     'Camera': 'CAMERA_DATA',
+    'Collection': 'OUTLINER_COLLECTION',
     'Curve': 'CURVE_DATA',
-    'Grease Pencil': 'GREASEPENCIL',
-    'Group': 'GROUP',
+    'Curves': 'CURVES_DATA',
+    'FreestyleLineStyle': 'LINE_DATA',
+    'GreasePencil': 'OUTLINER_DATA_GREASEPENCIL',
+    'GreasePencilv3': 'OUTLINER_DATA_GREASEPENCIL',
     'Image': 'IMAGE_DATA',
-    'Key': 'KEY_HLT',
+    'Key': 'SHAPEKEY_DATA',
     'Lattice': 'LATTICE_DATA',
+    'Library': 'LIBRARY_DATA_DIRECT',
+    'Light': 'LIGHT_DATA',
+    'LightProbe': 'OUTLINER_DATA_LIGHTPROBE',
     'Mask': 'MOD_MASK',
     'Material': 'MATERIAL',
     'Mesh': 'MESH_DATA',
     'MetaBall': 'META_DATA',
-    'MovieClip': 'CLIP',
-    'Object': 'OBJECT_DATAMODE',
-    'Particle Settings': 'PARTICLES',
+    'MovieClip': 'TRACKER',
+    'NodeTree': 'NODETREE',
+    'Object': 'OBJECT_DATA',
+    'PaintCurve': 'CURVE_BEZCURVE',
+    'Palette': 'COLOR',
+    'ParticleSettings': 'PARTICLES',
+    'PointCloud': 'POINTCLOUD_DATA',
     'Scene': 'SCENE_DATA',
+    'Screen': 'WORKSPACE',
+    'Sound': 'SOUND',
     'Speaker': 'SPEAKER',
-    'Surface Curve': 'SURFACE_DATA',
+    'SurfaceCurve': 'SURFACE_DATA',
     'Text': 'TEXT',
-    'Text Curve': 'FONT_DATA',
-    'Vector Font': 'FONT_DATA',
-    'World': 'WORLD'
-    }
-    if t in d:
-        return d[t]
+    'TextCurve': 'FONT_DATA',
+    'Texture': 'TEXTURE',
+    'VectorFont': 'FONT_DATA',
+    'Volume': 'VOLUME_DATA',
+    'WindowManager': 'WINDOW',
+    'WorkSpace': 'WORKSPACE',
+    'World': 'WORLD',
+}
+
+id_types = {}  # RNA identifier of every ID type -> (category, icon), the category being the identifier it is counted as
+icon_names = set()  # Icons that exist in this version of Blender
+
+
+def classify_rna(rna, valid_icons):
+    """ Category and icon of an ID type, from the nearest of it and its base types that has a known icon """
+    top = rna
+    base = rna
+    while base is not None and base.identifier != 'ID':
+        icon = ID_TYPE_ICONS.get(base.identifier)
+        if icon is not None and (valid_icons is None or icon in valid_icons):
+            return (base.identifier, icon)
+        top = base
+        base = base.base
+    return (top.identifier, "QUESTION")
+
+
+def build_id_types():
+    """ Classify every ID subclass Blender knows of, so that looking up a datablock's type is a single dict hit """
+    icon_names.clear()
+    icon_names.update(bpy.types.UILayout.bl_rna.functions['label'].parameters['icon'].enum_items.keys())
+    table = {}
+    pending = list(bpy.types.ID.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        rna = getattr(cls, 'bl_rna', None)
+        if rna is not None:
+            table[cls.__name__] = classify_rna(rna, icon_names)
+        pending.extend(cls.__subclasses__())
+
+    id_types.clear()
+    id_types.update(table)
+
+
+def id_type_info(id_data):
+    """ Category and icon of a datablock """
+    info = id_types.get(type(id_data).__name__)
+    if info is None:
+        # Type registered after the table was built, e.g. a custom node tree from another add-on
+        info = classify_rna(id_data.bl_rna, icon_names or None)
+        id_types[type(id_data).__name__] = info
+    return info
+
+
+def count_types(data):
+    rna_types = {}
+    for d in data:
+        t = id_type_info(d)[0]
+        if t in rna_types:
+            rna_types[t] += 1
+        else:
+            rna_types[t] = 1
+    return rna_types
+
+
+def type_icon(t):
+    """ Icon of a category or any other ID type identifier """
+    if t in id_types:
+        return id_types[t][1]
+    return ID_TYPE_ICONS.get(t, "QUESTION")  # QUESTION is the default icon
+
+
+#####  Linked data index  #####
+class LibraryEntry():
+    """ The datablocks linked from one library, and how many there are of each type """
+
+    def __init__(self):
+        self.ids = []
+        self.type_counts = {}  # category (see id_types) -> number of datablocks
+        self.view_key = None  # (filter text, sort mode) of self.view_ids
+        self.view_ids = []
+        self.tree = None  # DependencyTree, built when the library is first shown as a hierarchy
+
+    def add(self, id_data):
+        self.ids.append(id_data)
+        self.view_key = None
+        self.tree = None
+        t = id_type_info(id_data)[0]
+        if t in self.type_counts:
+            self.type_counts[t] += 1
+        else:
+            self.type_counts[t] = 1
+
+    def extend(self, other):
+        self.ids.extend(other.ids)
+        self.view_key = None
+        self.tree = None
+        for t, count in other.type_counts.items():
+            if t in self.type_counts:
+                self.type_counts[t] += count
+            else:
+                self.type_counts[t] = count
+
+    def view(self, filter_text, sort_mode, used=None, used_generation=None):
+        """ The datablocks as listed in the panel, only those in `used` if given.
+            Only recomputed when the filter, sorting or generation of `used` changes """
+        key = (filter_text, sort_mode, used_generation if used is not None else None)
+        if key != self.view_key:
+            ids = self.ids
+            if used is not None:
+                ids = [d for d in ids if d in used]
+            if filter_text:
+                needle = filter_text.lower()
+                ids = [d for d in ids if needle in d.name.lower()]
+            if sort_mode == 'NAME':
+                ids = sorted(ids, key=lambda d: d.name.lower())
+            self.view_ids = ids
+            self.view_key = key
+        return self.view_ids
+
+
+def node_key(id_data):
+    """ Identifies a datablock in a library for the expanded state of the hierarchy """
+    return id_type_info(id_data)[0] + ":" + id_data.name
+
+
+tree_state = {
+    'expanded': set(),  # (library name, node key) of expanded hierarchy nodes
+    'version': 0,  # Incremented whenever 'expanded' changes
+}
+
+
+class DependencyTree():
+    """ Which datablocks of a library use which others, e.g. collection -> object -> mesh -> material -> image """
+
+    def __init__(self, lib_name, ids, user_map):
+        self.lib_name = lib_name
+        self.children = {}  # datablock -> datablocks of the same library that it uses
+        in_lib = set(ids)
+        has_parent = set()
+        for d in ids:
+            for user in user_map.get(d, ()):
+                if user is not d and user in in_lib:
+                    if user in self.children:
+                        self.children[user].append(d)
+                    else:
+                        self.children[user] = [d]
+                    has_parent.add(d)
+        self.roots = [d for d in ids if d not in has_parent]
+
+        # Datablocks that only use each other in a cycle can't be reached from any root, so make one of them a root
+        reached = set()
+        self.mark_reached(self.roots, reached)
+        for d in ids:
+            if d not in reached:
+                self.roots.append(d)
+                self.mark_reached([d], reached)
+
+        self.rows_version = None
+        self.rows_cache = []
+
+    def mark_reached(self, start, reached):
+        stack = list(start)
+        while stack:
+            d = stack.pop()
+            if d not in reached:
+                reached.add(d)
+                stack.extend(self.children.get(d, ()))
+
+    def rows(self):
+        """ Visible rows as (depth, datablock, has children, is expanded). Children are only visited when expanded """
+        if self.rows_version == tree_state['version']:
+            return self.rows_cache
+
+        expanded = tree_state['expanded']
+        rows = []
+        path = []  # Datablocks above the current one, to stop at cycles
+
+        def visit(d, depth):
+            children = self.children.get(d, ())
+            is_expanded = bool(children) and (self.lib_name, node_key(d)) in expanded
+            rows.append((depth, d, bool(children), is_expanded))
+            if is_expanded and d not in path:
+                path.append(d)
+                for child in children:
+                    visit(child, depth + 1)
+                path.pop()
+
+        for d in self.roots:
+            visit(d, 0)
+
+        self.rows_version = tree_state['version']
+        self.rows_cache = rows
+        return rows
+
+
+class LibraryGraph():
+    """ Which libraries link which. Edges come from Library.parent and from datablocks used by another library's
+        datablocks, so a library pulled in by several others has all of them as parents """
+
+    def __init__(self, libraries, user_map):
+        self.parents = {lib.name: set() for lib in bpy.data.libraries}  # library -> libraries linking it
+        self.children = {lib.name: set() for lib in bpy.data.libraries}  # library -> libraries it links
+        for lib in bpy.data.libraries:
+            if lib.parent:
+                self.add_edge(lib.parent.name, lib.name)
+        for lib_name, entry in libraries.items():
+            for d in entry.ids:
+                for user in user_map.get(d, ()):
+                    if user.library and user.library.name != lib_name:
+                        self.add_edge(user.library.name, lib_name)
+
+        # Direct libraries are linked by the open file itself, all others only through other libraries
+        self.direct = [lib.name for lib in bpy.data.libraries if not lib.parent]
+
+        # Shortest chain of links from the open file, found breadth first from the direct libraries
+        self.depth = {}
+        self.via = {}  # library -> previous library in its shortest chain
+        self.roots = {name: set() for name in self.parents}  # library -> direct libraries that pull it in
+        queue = list(self.direct)
+        for name in queue:
+            self.depth[name] = 0
+            self.roots.setdefault(name, set()).add(name)
+        i = 0
+        while i < len(queue):
+            name = queue[i]
+            i += 1
+            for child in self.children.get(name, ()):
+                if child not in self.depth:
+                    self.depth[child] = self.depth[name] + 1
+                    self.via[child] = name
+                    queue.append(child)
+        for root in self.direct:
+            stack = [root]
+            seen = set()
+            while stack:
+                name = stack.pop()
+                if name not in seen:
+                    seen.add(name)
+                    self.roots.setdefault(name, set()).add(root)
+                    stack.extend(self.children.get(name, ()))
+
+        self.cycles = self.find_cycles()
+        self.in_cycle = {name for cycle in self.cycles for name in cycle}
+
+    def add_edge(self, parent, child):
+        self.children.setdefault(parent, set()).add(child)
+        self.parents.setdefault(child, set()).add(parent)
+        self.children.setdefault(child, set())
+        self.parents.setdefault(parent, set())
+
+    def find_cycles(self):
+        """ Libraries that (indirectly) link themselves, as lists of names with the first repeated at the end """
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = {name: WHITE for name in self.children}
+        cycles = []
+        for start in sorted(self.children):
+            if color[start] != WHITE:
+                continue
+            path = [start]
+            color[start] = GREY
+            stack = [iter(sorted(self.children[start]))]
+            while stack:
+                child = next(stack[-1], None)
+                if child is None:
+                    stack.pop()
+                    color[path.pop()] = BLACK
+                elif color[child] == WHITE:
+                    color[child] = GREY
+                    path.append(child)
+                    stack.append(iter(sorted(self.children[child])))
+                elif color[child] == GREY:
+                    cycles.append(path[path.index(child):] + [child])
+        return cycles
+
+    def fan_in(self, name):
+        """ Number of files linking this library, counting the open file for direct libraries """
+        return len(self.parents.get(name, ())) + (1 if name in self.direct else 0)
+
+    def chain(self, name):
+        """ Shortest chain of libraries from a direct library down to this one """
+        chain = [name]
+        while chain[-1] in self.via:
+            chain.append(self.via[chain[-1]])
+        return list(reversed(chain))
+
+
+class LinkedDataIndex():
+    """ Library name -> linked datablocks, built once when a file is loaded and patched as bpy.data changes,
+        so that the panel only has to read it instead of walking all of bpy.data on every redraw """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.collections = {}  # bpy.data collection name -> {library name: LibraryEntry}
+        self.lengths = {}  # bpy.data collection name -> length of the collection when it was last scanned
+        self.linked = {}  # bpy.data collection name -> set of its linked datablocks when it was last scanned
+        self.rescan = set()  # Collections to scan again even though their length is the same
+        self.libraries = {}  # library name -> LibraryEntry, merged from self.collections
+        self.library_count = -1
+        self.user_map = None  # bpy.data.user_map() of all linked datablocks, made when first needed
+        self.graph = None  # LibraryGraph, made when first needed
+        self.names = None  # NameIndex of all linked datablocks, made when first searched
+        self.footprint = None  # library_footprint() of all libraries, made on request
+        self.paths = {}  # library name -> absolute path of its file
+        self.dirty = True  # The datablocks held may have been freed, so the index must be rebuilt before it's read
+
+    def scan_collection(self, attr):
+        """ Group the linked datablocks of one collection by library and count their types in a single pass.
+            Returns False if the same number of datablocks is linked from each library as before """
+        data_iter = getattr(bpy.data, attr)
+        found = {}
+        linked = set()
+        for id_data in data_iter:
+            lib = id_data.library
+            if lib:
+                if lib.name not in found:
+                    found[lib.name] = LibraryEntry()
+                found[lib.name].add(id_data)
+                linked.add(id_data)
+        previous = self.collections.get(attr)
+        self.collections[attr] = found
+        self.lengths[attr] = len(data_iter)
+        self.linked[attr] = linked
+        self.rescan.discard(attr)
+        hot_path_stats.count('ids_visited', len(data_iter))
+        if previous is None or previous.keys() != found.keys():
+            return True
+        return any(len(previous[name].ids) != len(found[name].ids) for name in found)
+
+    def merge(self):
+        libraries = {lib.name: LibraryEntry() for lib in bpy.data.libraries}
+        for coll in id_collections():
+            for lib_name, entry in self.collections.get(coll.attr, {}).items():
+                if lib_name not in libraries:
+                    libraries[lib_name] = LibraryEntry()
+                libraries[lib_name].extend(entry)
+        self.libraries = libraries
+        self.user_map = None
+        self.graph = None
+        self.names = None
+        self.footprint = None
+        self.paths = {lib.name: library_abspath(lib) for lib in bpy.data.libraries}
+
+    def get_user_map(self):
+        """ Users of every linked datablock, from a single batched bpy.data.user_map() call """
+        if self.user_map is None:
+            linked = [d for entry in self.libraries.values() for d in entry.ids]
+            self.user_map = bpy.data.user_map(subset=linked)
+        return self.user_map
+
+    def compute_footprint(self):
+        self.footprint = library_footprint(self.libraries)
+        return self.footprint
+
+    def name_index(self):
+        """ Search index over the names of all linked datablocks, whose items are (library name, datablock) """
+        if self.names is None:
+            self.names = NameIndex((d.name, (lib_name, d))
+                                   for lib_name, entry in self.libraries.items() for d in entry.ids)
+        return self.names
+
+    def library_graph(self):
+        if self.graph is None:
+            self.graph = LibraryGraph(self.libraries, self.get_user_map())
+        return self.graph
+
+    def dependency_tree(self, lib_name):
+        entry = self.libraries[lib_name]
+        if entry.tree is None:
+            entry.tree = DependencyTree(lib_name, entry.ids, self.get_user_map())
+        return entry.tree
+
+    def library_changed(self, id_data):
+        """ Check whether a datablock was linked or made local in place since its collection was scanned, which
+            leaves the collection's length the same, and if so have the collection scanned again on the next update """
+        attr = id_collection_attr(id_data)
+        if attr is None or attr not in self.linked:
+            return False
+        if (id_data.library is not None) != (id_data in self.linked[attr]):
+            self.rescan.add(attr)
+            return True
+        return False
+
+    def shrunk(self):
+        """ True if libraries or datablocks were removed since the last scan, which may have freed ones we hold """
+        if len(bpy.data.libraries) < self.library_count:
+            return True
+        for coll in id_collections():
+            length = self.lengths.get(coll.attr)
+            if length is not None and len(getattr(bpy.data, coll.attr)) < length:
+                return True
+        return False
+
+    def update(self):
+        """ Rescan only the collections that grew or shrank since they were last scanned or that library_changed()
+            flagged, or everything if the index has been marked dirty. Returns True if anything changed """
+        changed = False
+        if self.dirty or len(bpy.data.libraries) != self.library_count:
+            self.collections = {}
+            self.lengths = {}
+            self.linked = {}
+            self.rescan = set()
+            self.library_count = len(bpy.data.libraries)
+            changed = True
+
+        with hot_path_stats.phase('scan'):
+            for coll in id_collections():
+                if coll.attr in self.rescan or self.lengths.get(coll.attr) != len(getattr(bpy.data, coll.attr)):
+                    # Only local datablocks were added or removed if the linked ones stayed the same
+                    if self.scan_collection(coll.attr):
+                        changed = True
+
+        if changed:
+            with hot_path_stats.phase('group'):
+                self.merge()
+        self.dirty = False
+        return changed
+
+
+linked_index = LinkedDataIndex()
+
+snapshot_state = {
+    'interval': 0.25,  # Minimum seconds between rebuilds, from the add-on preferences
+    'last': 0.0,  # time.perf_counter() of the last rebuild
+}
+
+
+def snapshot_timer():
+    """ Bring the linked data index, its library graph and the scene usage up to date, then redraw the panel if
+        anything changed """
+    snapshot_state['last'] = time.perf_counter()
+    changed = linked_index.update()
+    if linked_index.graph is None:
+        linked_index.library_graph()
+        changed = True
+    scene = bpy.context.scene
+    if scene_usage['used'] is None and scene is not None and scene.librarian_settings.scene_only:
+        find_scene_usage(bpy.context.evaluated_depsgraph_get())
+        changed = True
+    if changed:
+        tag_redraw()
+    return None
+
+
+def schedule_snapshot():
+    """ Rebuild the linked data index soon, but no sooner than the refresh interval after the last rebuild.
+        Calls made while a rebuild is already scheduled are merged into it """
+    if bpy.app.timers.is_registered(snapshot_timer):
+        return
+    wait = snapshot_state['last'] + snapshot_state['interval'] - time.perf_counter()
+    bpy.app.timers.register(snapshot_timer, first_interval=max(0.0, wait))
+
+
+scene_usage = {
+    'key': None,  # (scene name, view layer name) the usage was found for
+    'used': None,  # library name -> set of its datablocks the evaluated depsgraph uses, None until found
+    'generation': 0,  # Incremented whenever 'used' is rebuilt, so that filtered lists know to update
+}
+
+
+def clear_scene_usage():
+    scene_usage['used'] = None
+
+
+def find_scene_usage(depsgraph):
+    """ Find the linked datablocks an evaluated depsgraph uses in one pass over its ids. Called from
+        snapshot_timer(), so at most once per refresh interval however often the depsgraph updates, or when the
+        view is turned on, but never while drawing """
+    with hot_path_stats.phase('scene_usage'):
+        used = {}
+        for id_eval in depsgraph.ids:
+            id_data = id_eval.original
+            lib = id_data.library
+            if lib:
+                if lib.name in used:
+                    used[lib.name].add(id_data)
+                else:
+                    used[lib.name] = {id_data}
+    scene_usage['key'] = (depsgraph.scene.name, depsgraph.view_layer.name)
+    scene_usage['used'] = used
+    scene_usage['generation'] += 1
+
+
+def used_by_scene(context):
+    """ The linked datablocks used by the active scene and view layer, per library, as last found by
+        find_scene_usage(). None if they haven't been found since the last change, or were for another view layer """
+    if scene_usage['key'] != (context.scene.name, context.view_layer.name):
+        return None
+    return scene_usage['used']
+
+
+@persistent
+def librarian_load_post(dummy):
+    tree_state['expanded'].clear()
+    tree_state['version'] += 1
+    clear_scene_usage()
+    linked_index.clear()
+    linked_index.update()
+    file_stats.invalidate()
+    library_watcher.reset()
+    paths = [library_abspath(lib) for lib in bpy.data.libraries]
+    library_watcher.watch(paths)
+    file_stats.request(paths)  # The first stat after loading is what later ones are compared to
+
+
+@persistent
+def librarian_undo_post(dummy):
+    # Undo/redo reloads bpy.data, so the datablocks we hold on to are no longer valid
+    linked_index.dirty = True
+    clear_scene_usage()
+
+
+@persistent
+def librarian_depsgraph_update_post(scene, depsgraph=None):
+    clear_scene_usage()  # Anything may have started or stopped being used. Found again by the snapshot below
+    if depsgraph is not None:
+        for update in depsgraph.updates:
+            if isinstance(update.id, bpy.types.Library):
+                linked_index.dirty = True  # Library was reloaded or relocated, its datablocks were replaced
+                return
+            # e.g. made local, which doesn't change the length of its collection. Rescanned by the snapshot below
+            linked_index.library_changed(update.id.original)
+    if linked_index.shrunk():
+        linked_index.dirty = True  # Datablocks were deleted, stop drawing them before they're rebuilt
     else:
-        return "QUESTION"  # default icon
+        schedule_snapshot()  # Anything new only has to show up once the refresh interval has passed
+
+
+@persistent
+def librarian_save_post(dummy):
+    # Record what the saved file links, so the libraries' reverse index stays up to date without rescanning.
+    # Only its direct libraries, the same as Scan Folder records, which skips this file while it's unchanged
+    path = os.path.normpath(bpy.data.filepath)
+    signature = file_signature(path)
+    if signature is None:
+        return
+    try:
+        get_manifest_cache().store([(path, signature, linked_data_report(direct_only=True))])
+    except (OSError, sqlite3.Error) as e:
+        print("Librarian: couldn't record the links of {}: {}".format(path, e))
+
+
+handlers = [
+    (bpy.app.handlers.load_post, librarian_load_post),
+    (bpy.app.handlers.save_post, librarian_save_post),
+    (bpy.app.handlers.undo_post, librarian_undo_post),
+    (bpy.app.handlers.redo_post, librarian_undo_post),
+    (bpy.app.handlers.depsgraph_update_post, librarian_depsgraph_update_post),
+]
+
+
+def library_state(settings, lib_name):
+    """ UI state of a library, created the first time it is needed """
+    state = settings.libraries.get(lib_name)
+    if state is None:
+        state = settings.libraries.add()
+        state.name = lib_name
+    return state
 
 
-def pad_lib_name(lib):
-    """ Used to ensure lib names do not match inside each other ('Lib' won't match 'Lib.001') """
-    return ("__###_" + lib + "_###__")
+def reload_library(lib, profile=False):
+    """ Reload a library and refresh everything cached about it. With profile set, the reload is timed and its
+        ReloadRecord returned, for the caller to fill in its num_ids once the index has been updated """
+    path = library_abspath(lib)
+    record = None
+    if profile:
+        record = reload_profiler.measure(path, lib.reload)
+    else:
+        lib.reload()
+    linked_index.dirty = True
+    file_stats.invalidate(path)
+    library_watcher.reset(path)
+    file_stats.request([path])
+    return record
+
+
+def remap_rules(prefs):
+    """ The enabled remap rules of the add-on preferences, compiled """
+    return RemapRules([(rule.kind, rule.pattern, rule.replacement) for rule in prefs.remap_rules if rule.enabled])
+
+
+def remap_libraries(changes):
+    """ Point libraries at new paths, given as (library, old path, new path), and then reload each of them once """
+    for lib, old_path, new_path in changes:
+        lib.filepath = new_path
+    for lib, old_path, new_path in changes:
+        reload_library(lib)
+
+
+EXPORT_FIELDS = ('record', 'library', 'filepath', 'path', 'type', 'name', 'count')
+EXPORT_EXTENSIONS = {'CSV': ".csv", 'JSONL': ".jsonl"}
+
+
+def export_records():
+    """ The libraries of the open file, each followed by its type counts and its datablocks, one dict at a time:
+
+            {'record': 'library', 'library', 'filepath', 'path', 'count'}  (count being the number of datablocks)
+            {'record': 'type_count', 'library', 'type', 'count'}
+            {'record': 'datablock', 'library', 'type', 'name'}
+
+        Records are made as they are read, so writing them out never holds a second copy of the linked data """
+    if linked_index.dirty:
+        linked_index.update()
+    for lib in bpy.data.libraries:
+        entry = linked_index.libraries.get(lib.name) or LibraryEntry()
+        yield {'record': 'library', 'library': lib.name, 'filepath': lib.filepath,
+               'path': linked_index.paths.get(lib.name) or library_abspath(lib), 'count': len(entry.ids)}
+        for t, count in entry.type_counts.items():
+            yield {'record': 'type_count', 'library': lib.name, 'type': t, 'count': count}
+        for d in entry.ids:
+            yield {'record': 'datablock', 'library': lib.name, 'type': id_type_info(d)[0], 'name': d.name}
+
+
+def write_records(f, records, file_format):
+    """ Write records to an open text file as 'CSV' (with a header row) or 'JSONL'. Returns how many were written """
+    n = 0
+    if file_format == 'CSV':
+        writer = csv.DictWriter(f, EXPORT_FIELDS, restval="")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            n += 1
+    else:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            n += 1
+    return n
+
+
+def export_report(filepath, file_format=None):
+    """ Stream the library report of the open file to a CSV or JSON Lines file, by default chosen by its extension.
+        Also works in background mode, e.g. blender -b shot.blend --python-expr "import librarian; ..." """
+    if file_format is None:
+        file_format = 'JSONL' if filepath.lower().endswith((".jsonl", ".json")) else 'CSV'
+    with open(filepath, 'w', newline="" if file_format == 'CSV' else None, encoding='utf-8') as f:
+        return write_records(f, export_records(), file_format)
+
+
+manifest_caches = {}  # Database path -> open ManifestCache
+
+
+def get_manifest_cache():
+    """ The manifest cache in Blender's config folder, opened when first needed """
+    folder = bpy.utils.user_resource('CONFIG', path="librarian", create=True)
+    db_path = os.path.join(folder, "manifests.sqlite")
+    if db_path not in manifest_caches:
+        manifest_caches[db_path] = ManifestCache(db_path)
+    library_users_cache['cache'] = manifest_caches[db_path]
+    return manifest_caches[db_path]
+
+
+def open_manifest_cache():
+    """ Open the manifest cache ahead of drawing, so that the panel only reads it. Returns None if that failed """
+    try:
+        return get_manifest_cache()
+    except (OSError, sqlite3.Error) as e:
+        print("Librarian: couldn't open the manifest cache: {}".format(e))
+        return None
+
+
+library_users_cache = {
+    'cache': None,  # ManifestCache the panel reads, set once it has been opened outside of drawing
+    'generation': None,  # ManifestCache.generation the cached results are from
+    'users': {},  # library path -> {file path: [datablock names]}
+}
+
+
+def library_users(path):
+    """ Files in the manifest cache that link this library, cached until the manifest cache changes.
+        Empty if the manifest cache isn't open, since this is called from draw() """
+    cache = library_users_cache['cache']
+    if cache is None:
+        return {}
+    if library_users_cache['generation'] != cache.generation:
+        library_users_cache['users'] = {}
+        library_users_cache['generation'] = cache.generation
+    users = library_users_cache['users']
+    if path not in users:
+        try:
+            users[path] = cache.users_of(path)
+        except sqlite3.Error as e:  # e.g. locked by a scan in another Blender. Not retried until the cache changes
+            print("Librarian: couldn't look up the users of {}: {}".format(path, e))
+            users[path] = {}
+    return users[path]
+
+
+def draw_stats():
+    """ Timings of the panel's draw and of scanning the linked data, and how many datablocks and labels they
+        went through, e.g. to compare real production files before and after a change:
+
+            {'phases': {'scan': {'calls', 'total_ms', 'last_ms', 'mean_ms'}, 'group', 'histogram', 'scene_usage',
+                        'layout', 'draw'},
+             'counters': {'ids_visited', 'labels_emitted'},
+             'draw': {'samples', 'p50_ms', 'p95_ms'}}
+
+        The histogram and scene_usage phases are part of layout, which is the draw minus rescanning a dirty index """
+    return hot_path_stats.as_dict()
 
 
 #####  Operators #####
@@ -184,13 +1116,57 @@ class LIBRARIAN_OT_expand(bpy.types.Operator):
     lib: bpy.props.StringProperty()  # name of lib to toggle
 
     def execute(self, context):
-        expanded = context.scene.librarian_settings.expanded
-        if self.lib in expanded:
-            expanded = expanded.replace(self.lib, "")
+        state = library_state(context.scene.librarian_settings, self.lib)
+        state.expanded = not state.expanded
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_expand_all(bpy.types.Operator):
+    """Show or hide the datablocks of all libraries"""
+    bl_idname = "librarian.expand_all"
+    bl_label = "Expand All"
+    expand: bpy.props.BoolProperty(default=True)
+
+    def execute(self, context):
+        settings = context.scene.librarian_settings
+        for lib in bpy.data.libraries:
+            library_state(settings, lib.name).expanded = self.expand
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_expand_node(bpy.types.Operator):
+    """Show/hide the datablocks used by this one"""
+    bl_idname = "librarian.expand_node"
+    bl_label = "Expand Node"
+    bl_options = {'INTERNAL'}
+    lib: bpy.props.StringProperty()  # name of lib the datablock comes from
+    node: bpy.props.StringProperty()  # node_key() of the datablock
+
+    def execute(self, context):
+        key = (self.lib, self.node)
+        expanded = tree_state['expanded']
+        if key in expanded:
+            expanded.remove(key)
         else:
-            expanded += self.lib
+            expanded.add(key)
+        tree_state['version'] += 1
+
+        return {'FINISHED'}
 
-        context.scene.librarian_settings.expanded = expanded
+
+class LIBRARIAN_OT_page(bpy.types.Operator):
+    """Show the next or previous page of datablocks"""
+    bl_idname = "librarian.page"
+    bl_label = "Change Page"
+    bl_options = {'INTERNAL'}
+    lib: bpy.props.StringProperty()  # name of lib to change the page of
+    delta: bpy.props.IntProperty(default=1)
+
+    def execute(self, context):
+        state = library_state(context.scene.librarian_settings, self.lib)
+        state.page = max(0, state.page + self.delta)
 
         return {'FINISHED'}
 
@@ -203,66 +1179,401 @@ class LIBRARIAN_OT_reload(bpy.types.Operator):
     lib: bpy.props.StringProperty()
 
     def execute(self, context):
-        bpy.data.libraries[self.lib].reload()
+        reload_library(bpy.data.libraries[self.lib])
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_reload_changed(bpy.types.Operator):
+    """Reload only the libraries whose file changed on disk since they were loaded, dependencies first"""
+    bl_idname = "librarian.reload_changed"
+    bl_label = "Reload Changed Libraries"
+
+    def execute(self, context):
+        graph = linked_index.library_graph()
+        changed = [lib for lib in bpy.data.libraries if library_watcher.is_stale(library_abspath(lib))]
+        if not changed:
+            self.report({'INFO'}, "No libraries changed on disk")
+            return {'CANCELLED'}
+
+        # Deepest first, so a library is up to date by the time the libraries linking it are reloaded
+        changed.sort(key=lambda lib: graph.depth.get(lib.name, 0), reverse=True)
+        names = [lib.name for lib in changed]
+        for name in names:
+            reload_library(bpy.data.libraries[name])
+
+        self.report({'INFO'}, "Reloaded {} librar{}".format(len(names), "y" if len(names) == 1 else "ies"))
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_footprint(bpy.types.Operator):
+    """Count the vertices, faces and loaded image memory that each library brings into this file"""
+    bl_idname = "librarian.footprint"
+    bl_label = "Library Footprint"
+
+    def execute(self, context):
+        if linked_index.dirty:
+            linked_index.update()
+        linked_index.compute_footprint()
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_export_report(bpy.types.Operator, ExportHelper):
+    """Save every library with its file path, type counts and datablocks to a CSV or JSON Lines file"""
+    bl_idname = "librarian.export_report"
+    bl_label = "Export Library Report"
+    filename_ext = ".csv"
+    filter_glob: bpy.props.StringProperty(default="*.csv;*.jsonl", options={'HIDDEN'})
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        items=(
+            ('CSV', "CSV", "One row per library, type count and datablock, for spreadsheets"),
+            ('JSONL', "JSON Lines", "One JSON object per library, type count and datablock, for scripts"),
+            ),
+        default='CSV',
+        )
+
+    def check(self, context):
+        """ Keep the extension of the file name in line with the chosen format """
+        root, ext = os.path.splitext(self.filepath)
+        if ext.lower() not in EXPORT_EXTENSIONS.values():
+            root = self.filepath
+        filepath = root + EXPORT_EXTENSIONS[self.file_format]
+        if filepath != self.filepath:
+            self.filepath = filepath
+            return True
+        return False
+
+    def execute(self, context):
+        self.check(context)
+        try:
+            n = export_report(self.filepath, self.file_format)
+        except OSError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "Exported {:,} records to {}".format(n, self.filepath))
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_profile_reload(bpy.types.Operator):
+    """Reload every library one at a time, recording how long each one takes"""
+    bl_idname = "librarian.profile_reload"
+    bl_label = "Profile Reload All"
+
+    def execute(self, context):
+        graph = linked_index.library_graph()
+        names = sorted((lib.name for lib in bpy.data.libraries), key=lambda name: graph.depth.get(name, 0), reverse=True)
+        records = {name: reload_library(bpy.data.libraries[name], profile=True) for name in names}
+        linked_index.update()  # Once for all the libraries, rather than after each of them
+        for name, record in records.items():
+            record.num_ids = len(linked_index.libraries[name].ids) if name in linked_index.libraries else 0
+        context.scene.librarian_settings.show_profile = True
+
+        self.report({'INFO'}, "Reloaded {} libraries in {:.2f} s".format(len(names), reload_profiler.total()))
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_export_profile(bpy.types.Operator, ExportHelper):
+    """Save the recorded reload timings of all libraries to a JSON file"""
+    bl_idname = "librarian.export_profile"
+    bl_label = "Export Reload Timings"
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        try:
+            reload_profiler.export(self.filepath)
+        except OSError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_reset_stats(bpy.types.Operator):
+    """Forget the recorded draw timings and counters"""
+    bl_idname = "librarian.reset_stats"
+    bl_label = "Reset Draw Statistics"
+
+    def execute(self, context):
+        hot_path_stats.reset()
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_scan_folder(bpy.types.Operator):
+    """Read the links of all .blend files in a folder into the manifest cache. Unchanged files are not read again"""
+    bl_idname = "librarian.scan_folder"
+    bl_label = "Scan Folder"
+    directory: bpy.props.StringProperty(subtype="DIR_PATH")
+    rescan: bpy.props.BoolProperty(
+        name="Rescan All",
+        description="Read every file again, even the ones that haven't changed since they were last scanned",
+        default=False,
+        )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        if not os.path.isdir(self.directory):
+            self.report({'ERROR'}, self.directory + " is not a folder")
+            return {'CANCELLED'}
+
+        try:
+            cache = get_manifest_cache()
+            if self.rescan:
+                cache.invalidate(cache.paths_in(self.directory))
+            num_files, num_read = cache.scan_folder(self.directory, blendfile.read_links)
+        except (OSError, sqlite3.Error) as e:
+            self.report({'ERROR'}, "Couldn't update the manifest cache: {}".format(e))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "Scanned {} files, {} of them new or changed".format(num_files, num_read))
+        return {'FINISHED'}
+
+
+MAX_REMAPS_SHOWN = 20  # Changes listed in the preview of librarian.remap
+
+
+class LIBRARIAN_OT_remap_rule_add(bpy.types.Operator):
+    """Add a rule for rewriting library paths"""
+    bl_idname = "librarian.remap_rule_add"
+    bl_label = "Add Rule"
+
+    def execute(self, context):
+        context.preferences.addons[__package__].preferences.remap_rules.add()
+        context.preferences.is_dirty = True
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_remap_rule_remove(bpy.types.Operator):
+    """Remove this rule"""
+    bl_idname = "librarian.remap_rule_remove"
+    bl_label = "Remove Rule"
+    index: bpy.props.IntProperty()
+
+    def execute(self, context):
+        context.preferences.addons[__package__].preferences.remap_rules.remove(self.index)
+        context.preferences.is_dirty = True
 
         return {'FINISHED'}
 
 
+class LIBRARIAN_OT_remap_rule_move(bpy.types.Operator):
+    """Move this rule up or down. Rules are tried from the top, and the first one matching a path is used"""
+    bl_idname = "librarian.remap_rule_move"
+    bl_label = "Move Rule"
+    index: bpy.props.IntProperty()
+    delta: bpy.props.IntProperty()  # -1 moves the rule up, 1 down
+
+    def execute(self, context):
+        rules = context.preferences.addons[__package__].preferences.remap_rules
+        target = self.index + self.delta
+        if 0 <= target < len(rules):
+            rules.move(self.index, target)
+            context.preferences.is_dirty = True
+
+        return {'FINISHED'}
+
+
+class LIBRARIAN_OT_remap(bpy.types.Operator):
+    """Rewrite the paths of all libraries with the remap rules, previewing the changes first, then reload them"""
+    bl_idname = "librarian.remap"
+    bl_label = "Remap Library Paths"
+    bl_options = {'REGISTER', 'UNDO'}
+    dry_run: bpy.props.BoolProperty(
+        name="Dry Run",
+        description="Only report which paths would change",
+        default=False,
+        )
+
+    def plan(self, context):
+        try:
+            rules = remap_rules(context.preferences.addons[__package__].preferences)
+            changes, self.indirect = plan_remap(rules, bpy.data.libraries)
+        except ValueError as e:  # Invalid pattern, or a replacement referring to a group the pattern doesn't have
+            self.report({'ERROR'}, str(e))
+            return None
+        # By name: redoing the operator, e.g. after toggling Dry Run, undoes it first, which frees the libraries
+        self.changes = [(lib.name, old_path, new_path) for lib, old_path, new_path in changes]
+        if not self.changes:
+            self.report({'INFO'}, "The rules don't change the path of any direct library")
+            return None
+        return self.changes
+
+    def invoke(self, context, event):
+        if self.plan(context) is None:
+            return {'CANCELLED'}
+        return context.window_manager.invoke_props_dialog(self, width=600)
+
+    def draw(self, context):
+        col = self.layout.column(align=True)
+        col.label(text="{} librar{} will be remapped and reloaded:".format(
+            len(self.changes), "y" if len(self.changes) == 1 else "ies"))
+        for name, old_path, new_path in self.changes[:MAX_REMAPS_SHOWN]:
+            col.label(text=old_path, icon='LIBRARY_DATA_DIRECT')
+            col.label(text=new_path, icon='FORWARD')
+        if len(self.changes) > MAX_REMAPS_SHOWN:
+            col.label(text="...and {} more".format(len(self.changes) - MAX_REMAPS_SHOWN))
+        if self.indirect:
+            col.separator()
+            col.label(text="Indirect libraries are remapped in the files linking them, skipping: " +
+                      ", ".join(self.indirect), icon='INFO')
+        col.separator()
+        col.prop(self, 'dry_run')
+
+    def execute(self, context):
+        if not hasattr(self, 'changes') and self.plan(context) is None:  # Run from a script, without invoke
+            return {'CANCELLED'}
+
+        changes = [(bpy.data.libraries[name], old_path, new_path) for name, old_path, new_path in self.changes
+                   if name in bpy.data.libraries]
+        for lib, old_path, new_path in changes:
+            print("Librarian: {}{} -> {}".format("(dry run) " if self.dry_run else "", old_path, new_path))
+        if self.dry_run:
+            self.report({'INFO'}, "{} librar{} would be remapped, see the console".format(
+                len(changes), "y" if len(changes) == 1 else "ies"))
+            return {'FINISHED'}
+
+        remap_libraries(changes)
+        self.report({'INFO'}, "Remapped {} librar{}".format(len(changes), "y" if len(changes) == 1 else "ies"))
+        return {'FINISHED'}
+
+
+def collection_children(coll):
+    """ All collections nested in a collection, at any depth """
+    children = []
+    pending = list(coll.children)
+    while pending:
+        child = pending.pop()
+        children.append(child)
+        pending.extend(child.children)
+    return children
+
+
 class LIBRARIAN_OT_importblend(bpy.types.Operator, ImportHelper):
-    """Import all objects from another file into the current scene, keeping the linked libraries in tact"""
+    """Import objects from other files into the current scene, keeping the linked libraries in tact"""
     bl_idname = 'librarian.import'
     bl_label = 'Import Objects from File'
     bl_options = {'REGISTER', 'UNDO'}
+    filter_glob: bpy.props.StringProperty(default="*.blend", options={'HIDDEN'})
     directory: bpy.props.StringProperty(subtype="DIR_PATH")
     filename: bpy.props.StringProperty(subtype="FILE_NAME")
-    # files: CollectionProperty(type=bpy.types.OperatorFileListElement, options={'HIDDEN', 'SKIP_SAVE'})
-
-    def execute(self, context):
-        directory = self.directory
-        filename = self.filename
+    files: bpy.props.CollectionProperty(type=bpy.types.OperatorFileListElement, options={'HIDDEN', 'SKIP_SAVE'})
+    mode: bpy.props.EnumProperty(
+        name="Import",
+        items=(
+            ('SELECTIVE', "Objects & Collections",
+             "Only load the objects and collections matching the name filter, into one new collection per file"),
+            ('SCENES', "Whole Scenes",
+             "Load every scene of the file and link all their objects into the current scene"),
+            ),
+        default='SELECTIVE',
+        )
+    import_objects: bpy.props.BoolProperty(name="Objects", default=True)
+    import_collections: bpy.props.BoolProperty(name="Collections", default=True)
+    name_filter: bpy.props.StringProperty(
+        name="Names",
+        description="Only import datablocks whose name matches this pattern (* and ? are wildcards)",
+        default="*",
+        )
 
-        # DEBUG
-        print ("\nDIR:", directory)
-        print ("FN:", filename)
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'mode')
+        if self.mode == 'SELECTIVE':
+            row = layout.row(align=True)
+            row.prop(self, 'import_objects', toggle=True)
+            row.prop(self, 'import_collections', toggle=True)
+            layout.prop(self, 'name_filter')
 
-        if not filename:
+    def execute(self, context):
+        filenames = [f.name for f in self.files if f.name] or ([self.filename] if self.filename else [])
+        if not filenames:
             self.report({'ERROR'}, "No file chosen")
             return {'CANCELLED'}
 
-        filepath = os.path.join(directory, filename)
-
-        if not os.path.exists(filepath):
-            self.report({'ERROR'}, filepath+" does not exist!")
-            return {'CANCELLED'}
+        for filename in filenames:
+            filepath = os.path.join(self.directory, filename)
+            if not os.path.exists(filepath):
+                self.report({'ERROR'}, filepath+" does not exist!")
+                return {'CANCELLED'}
+
+        imported = 0
+        for filename in filenames:
+            filepath = os.path.join(self.directory, filename)
+            if self.mode == 'SCENES':
+                imported += self.import_scenes(context, filepath)
+            else:
+                imported += self.import_selected(context, filepath)
+
+        self.report({'INFO'}, "Imported {} objects from {} file{}".format(
+            imported, len(filenames), "" if len(filenames) == 1 else "s"))
+        return {'FINISHED'}
 
-        # Get all the scenes from the selected file
+    def import_selected(self, context, filepath):
+        """ Load only the matching objects and collections, and link them all through one new collection """
+        with bpy.data.libraries.load(filepath) as (data_from, data_to):
+            # fnmatchcase rather than fnmatch.filter, which ignores case on Windows only
+            if self.import_collections:
+                data_to.collections = [n for n in data_from.collections if fnmatch.fnmatchcase(n, self.name_filter)]
+            if self.import_objects:
+                data_to.objects = [n for n in data_from.objects if fnmatch.fnmatchcase(n, self.name_filter)]
+
+        collections = [c for c in data_to.collections if c is not None]
+        objects = [o for o in data_to.objects if o is not None]
+        if not collections and not objects:
+            return 0
+
+        target = bpy.data.collections.new(os.path.splitext(os.path.basename(filepath))[0])
+        context.scene.collection.children.link(target)
+
+        # Only link the outermost collections, the nested ones and their objects come along with them
+        nested = set()
+        in_collections = set()
+        for coll in collections:
+            nested.update(collection_children(coll))
+            in_collections.update(coll.all_objects)
+        for coll in collections:
+            if coll not in nested:
+                target.children.link(coll)
+        for obj in objects:
+            if obj not in in_collections:
+                target.objects.link(obj)
+
+        imported = set(objects) | in_collections
+        for obj in imported:
+            obj.select_set(True)
+        return len(imported)
+
+    def import_scenes(self, context, filepath):
+        """ Load every scene of the file, link their objects into the current scene, then remove the scenes """
         with bpy.data.libraries.load(filepath) as (data_from, data_to):
             data_to.scenes = data_from.scenes
 
-        # Add all objects from those scenes into the current scene
         cur_scene = context.scene
-        scene_names = []
+        objects = set()
         for sc in data_to.scenes:
-            scene_names.append (sc.name)
-            for obj in sc.objects:
-                cur_scene.objects.link(obj)
-                obj.select = True
-
-        print ("2")
-        context.screen.scene = cur_scene
-        print ("3")
+            objects.update(sc.objects)
+        for obj in objects:
+            cur_scene.collection.objects.link(obj)
+            obj.select_set(True)
 
-        # Remove imported scenes
-        print ("4")
         for sc in data_to.scenes:
-            print ("5:", sc)
             bpy.data.scenes.remove(sc)
-            print ("6:", sc)
 
-        return {'FINISHED'}
+        return len(objects)
 
 
 #####  UI  #####
+MAX_USERS_SHOWN = 10  # Files listed under a library that is linked by others
+
+
 class LIBRARIAN_PT_libraries(bpy.types.Panel):
     bl_label = "Librarian"
     bl_idname = "OBJECT_PT_Librarian"
@@ -272,64 +1583,302 @@ class LIBRARIAN_PT_libraries(bpy.types.Panel):
     bl_options = {'DEFAULT_CLOSED'}
 
     def draw(self, context):
+        draw_start = time.perf_counter()
         addon_updater_ops.check_for_update_background()
 
         layout = self.layout
-        linked_data = get_linked_data()
         settings = context.scene.librarian_settings
 
-        libs = {}  # Dictionary of libraries, with items being lists of linked assets
-        for lib in bpy.data.libraries:
-            libs[lib] = []
+        # Only rebuilt here when the datablocks it holds may have been freed (undo, reload, deletion).
+        # Other changes are picked up by snapshot_timer, so redraws just read the last snapshot
+        if linked_index.dirty:
+            linked_index.update()
+        layout_start = time.perf_counter()
+        labels = 0  # Labels emitted for datablocks, libraries and type counts
 
-        for g in linked_data:
-            libs[g.library] += [g]
+        libs = {}  # Dictionary of libraries, with items being the LibraryEntry of their linked assets
+        for lib in bpy.data.libraries:
+            libs[lib] = linked_index.libraries.get(lib.name) or LibraryEntry()
+
+        states = {state.name: state for state in settings.libraries}
+        # Building the graph takes a bpy.data.user_map() of every linked datablock, so it's left to snapshot_timer
+        # unless a library is expanded. Until then, collapsed libraries are drawn without their cycle warnings
+        graph = linked_index.graph
+        if graph is None:
+            schedule_snapshot()
+        prefs = context.preferences.addons[__package__].preferences
+        huge_size = prefs.huge_library_size * 1024 * 1024
+        page_size = prefs.page_size
+
+        lib_paths = {lib: linked_index.paths.get(lib.name) or library_abspath(lib) for lib in libs}
+        current_file = os.path.normpath(bpy.data.filepath) if bpy.data.filepath else None
+        file_stats.request(lib_paths.values())  # Only stats paths that haven't been yet, in the background
+        library_watcher.watch(lib_paths.values())
+        num_stale = sum(1 for path in lib_paths.values() if library_watcher.is_stale(path))
+        used = used_by_scene(context) if settings.scene_only else None  # Unfiltered until it has been found
+        if settings.scene_only and used is None:
+            schedule_snapshot()
 
         maincol = layout.column(align=True)
+        if libs:
+            maincol.prop(settings, 'search', text="", icon='VIEWZOOM')
+            if settings.search:
+                num_found, found = linked_index.name_index().results(settings.search, page_size)
+                box = maincol.box()
+                col = box.column(align=True)
+                labels += 2 * len(found)
+                for lib_name, d in found:
+                    row = col.row()
+                    row.label(text=d.name, icon=id_type_info(d)[1])
+                    row.label(text=lib_name, icon='LIBRARY_DATA_DIRECT')
+                if num_found > len(found):
+                    col.label(text="...and {} more".format(num_found - len(found)))
+                elif not found:
+                    col.label(text="No linked datablocks match")
+                maincol.separator()
+
+            row = maincol.row(align=True)
+            row.prop(settings, 'filter_text', text="", icon='FILTER')
+            row.prop(settings, 'sort_mode', text="", icon_only=True)
+            row.prop(settings, 'view_mode', text="", icon_only=True)
+            row.prop(settings, 'scene_only', text="", icon='SCENE_DATA')
+            row.operator('librarian.expand_all', text="", icon='DISCLOSURE_TRI_DOWN').expand = True
+            row.operator('librarian.expand_all', text="", icon='DISCLOSURE_TRI_RIGHT').expand = False
+            row.operator('librarian.footprint', text="", icon='MESH_DATA')
+            row.operator('librarian.export_report', text="", icon='EXPORT')
+            maincol.separator()
+            if num_stale:
+                maincol.operator('librarian.reload_changed', icon='FILE_REFRESH',
+                                 text="Reload {} Changed Librar{}".format(num_stale, "y" if num_stale == 1 else "ies"))
+                maincol.separator()
+
         for lib in libs:
-            padded_name = pad_lib_name(lib.name)
-            is_expanded = padded_name in settings.expanded
+            state = states.get(lib.name)
+            is_expanded = state is not None and state.expanded
+            stored_page = state.page if state is not None else 0
 
             box = maincol.box()
             col = box.column(align=True)
             row = col.row()
-            row.operator('librarian.expand', text="", emboss=False, icon='TRIA_RIGHT' if not is_expanded else 'TRIA_DOWN').lib = padded_name
-            row.label(text=bpy.path.basename(lib.filepath))
+            labels += 1
+            row.operator('librarian.expand', text="", emboss=False, icon='TRIA_RIGHT' if not is_expanded else 'TRIA_DOWN').lib = lib.name
+            row.label(text=bpy.path.basename(lib.filepath),
+                      icon='LIBRARY_DATA_DIRECT' if lib.parent is None else 'LIBRARY_DATA_INDIRECT')
+            if graph is not None and lib.name in graph.in_cycle:
+                row.label(text="", icon='ERROR')
+            stat = file_stats.get(lib_paths[lib])
+            if stat is None:
+                row.label(text="", icon='TIME')  # Not stat-ed yet
+            elif stat.missing:
+                row.alert = True
+                row.label(text="Missing", icon='ERROR')
+            elif stat.error:
+                row.label(text="", icon='ERROR')
+            elif stat.size > huge_size:
+                row.label(text=format_size(stat.size), icon='INFO')
+            footprint = linked_index.footprint.get(lib.name) if linked_index.footprint else None
+            if library_watcher.is_stale(lib_paths[lib]):
+                row.label(text="Changed", icon='FILE_REFRESH')
+            if used is not None:
+                row.label(text="{}/{} used".format(len(used.get(lib.name, ())), len(libs[lib].ids)), icon='SCENE_DATA')
 
             if is_expanded:
                 row = col.row(align=True)
                 row.prop(lib, 'filepath', text="")
                 row.operator('librarian.reload', icon='FILE_REFRESH', text="").lib=lib.name
+                if stat is not None and not stat.missing:
+                    if stat.error:
+                        col.label(text=stat.error, icon='ERROR')
+                    else:
+                        col.label(text="{}, modified {}".format(
+                            format_size(stat.size),
+                            time.strftime("%Y-%m-%d %H:%M", time.localtime(stat.mtime))), icon='FILE_BLEND')
+
+                if footprint is not None:
+                    col.label(text="{:,} meshes: {:,} vertices, {:,} faces".format(
+                        footprint['meshes'], footprint['vertices'], footprint['faces']), icon='MESH_DATA')
+                    col.label(text="{:,} loaded images: {}".format(
+                        footprint['images'], format_size(footprint['image_bytes'])), icon='IMAGE_DATA')
+
+                graph = linked_index.library_graph()
+                if lib.name not in graph.direct:
+                    chain = graph.chain(lib.name)
+                    if len(chain) > 1:
+                        col.label(text="Linked through: " + " > ".join(chain[:-1]), icon='LINKED')
+                    roots = graph.roots.get(lib.name)
+                    if roots:
+                        col.label(text="Pulled in by: " + ", ".join(sorted(roots)))
+                col.label(text="Depth {}, linked by {} file(s), links {} librar{}".format(
+                    graph.depth.get(lib.name, 0),
+                    graph.fan_in(lib.name),
+                    len(graph.children.get(lib.name, ())),
+                    "y" if len(graph.children.get(lib.name, ())) == 1 else "ies"))
+                for cycle in graph.cycles:
+                    if lib.name in cycle:
+                        col.label(text="Cycle: " + " > ".join(cycle), icon='ERROR')
+
+                users = library_users(lib_paths[lib])
+                other_users = [path for path in users if path != current_file]
+                if other_users:
+                    col.label(text="Also linked by {} scanned file{}:".format(
+                        len(other_users), "" if len(other_users) == 1 else "s"), icon='LINKED')
+                    for path in other_users[:MAX_USERS_SHOWN]:
+                        col.label(text="    {}  ({} datablocks)".format(os.path.basename(path), len(users[path])))
+                    if len(other_users) > MAX_USERS_SHOWN:
+                        col.label(text="    ...and {} more".format(len(other_users) - MAX_USERS_SHOWN))
                 col.separator()
 
-                type_counts = count_types(libs[lib])
-                row = col.row(align=True)
-                row.alignment = 'CENTER'
-                for t in type_counts:
-                    row.label(text=str(type_counts[t]), icon=type_icon(t))
-
-                    # # Debug: print unidentified types
-                    # ti = type_icon(t)
-                    # if ti == "QUESTION":
-                    #     print (t)
+                with hot_path_stats.phase('histogram'):
+                    type_counts = libs[lib].type_counts
+                    row = col.row(align=True)
+                    row.alignment = 'CENTER'
+                    for t in type_counts:
+                        row.label(text=str(type_counts[t]), icon=type_icon(t))
+                labels += len(type_counts)
 
                 col.separator()
-                for d in libs[lib]:
-                    col.label(text=d.name, icon=type_icon(d.rna_type.name))
+                if settings.view_mode == 'TREE' and libs[lib].ids:
+                    ids = linked_index.dependency_tree(lib.name).rows()
+                else:
+                    ids = libs[lib].view(settings.filter_text, settings.sort_mode,
+                                         used.get(lib.name, set()) if used is not None else None,
+                                         scene_usage['generation'])
+                num_pages = max(1, -(-len(ids) // page_size))
+                page = min(stored_page, num_pages - 1)
+                labels += len(ids[page * page_size:(page + 1) * page_size])
+                for d in ids[page * page_size:(page + 1) * page_size]:
+                    if settings.view_mode == 'TREE' and libs[lib].ids:
+                        depth, d, has_children, is_node_expanded = d
+                        row = col.row()
+                        if depth:
+                            row.separator(factor=2.0 * depth)
+                        if has_children:
+                            op = row.operator('librarian.expand_node', text="", emboss=False,
+                                              icon='DISCLOSURE_TRI_DOWN' if is_node_expanded else 'DISCLOSURE_TRI_RIGHT')
+                            op.lib = lib.name
+                            op.node = node_key(d)
+                        else:
+                            row.label(icon='BLANK1')
+                        row.label(text=d.name, icon=id_type_info(d)[1])
+                    else:
+                        col.label(text=d.name, icon=id_type_info(d)[1])
+
+                if num_pages > 1:
+                    row = col.row(align=True)
+                    sub = row.row(align=True)
+                    sub.enabled = page > 0
+                    op = sub.operator('librarian.page', text="", icon='TRIA_LEFT')
+                    op.lib = lib.name
+                    op.delta = -1 - (stored_page - page)  # Also undo any overshoot from a shrunk list
+                    row.label(text="Page {} of {}  ({} datablocks)".format(page + 1, num_pages, len(ids)))
+                    sub = row.row(align=True)
+                    sub.enabled = page < num_pages - 1
+                    op = sub.operator('librarian.page', text="", icon='TRIA_RIGHT')
+                    op.lib = lib.name
+                    op.delta = 1
         if len(libs) == 0:
             maincol.label(text="There are no linked libraries :)")
 
         maincol.separator()
         maincol.operator('librarian.import', icon='LIBRARY_DATA_DIRECT')
+        maincol.operator('librarian.scan_folder', icon='FILE_FOLDER')
+
+        if libs:
+            box = layout.box()
+            col = box.column(align=True)
+            row = col.row(align=True)
+            row.prop(settings, 'show_profile', emboss=False,
+                     icon='TRIA_DOWN' if settings.show_profile else 'TRIA_RIGHT')
+            row.operator('librarian.profile_reload', text="", icon='TIME')
+            if settings.show_profile:
+                slowest = reload_profiler.slowest()
+                if not slowest:
+                    col.label(text="Profile to see which libraries are slowest to reload")
+                for record in slowest:
+                    text = "{:.2f} s  {}  ({} datablocks".format(record.seconds, os.path.basename(record.path), record.num_ids)
+                    if record.memory_delta is not None:
+                        text += ", {}{}".format("+" if record.memory_delta >= 0 else "-", format_size(abs(record.memory_delta)))
+                    col.label(text=text + ")")
+                if slowest:
+                    col.separator()
+                    col.operator('librarian.export_profile', icon='EXPORT')
+
+            box = layout.box()
+            col = box.column(align=True)
+            col.prop(settings, 'show_remap', emboss=False,
+                     icon='TRIA_DOWN' if settings.show_remap else 'TRIA_RIGHT')
+            if settings.show_remap:
+                for i, rule in enumerate(prefs.remap_rules):
+                    row = col.row(align=True)
+                    row.prop(rule, 'enabled', text="")
+                    row.prop(rule, 'kind', text="", icon_only=True)
+                    row.prop(rule, 'pattern', text="")
+                    row.prop(rule, 'replacement', text="")
+                    sub = row.row(align=True)
+                    sub.enabled = i > 0
+                    op = sub.operator('librarian.remap_rule_move', text="", icon='TRIA_UP')
+                    op.index = i
+                    op.delta = -1
+                    sub = row.row(align=True)
+                    sub.enabled = i < len(prefs.remap_rules) - 1
+                    op = sub.operator('librarian.remap_rule_move', text="", icon='TRIA_DOWN')
+                    op.index = i
+                    op.delta = 1
+                    row.operator('librarian.remap_rule_remove', text="", icon='X').index = i
+                row = col.row(align=True)
+                row.operator('librarian.remap_rule_add', icon='ADD')
+                sub = row.row(align=True)
+                sub.enabled = len(prefs.remap_rules) > 0
+                sub.operator('librarian.remap', icon='FILE_REFRESH')
+
+        if prefs.show_stats:
+            box = layout.box()
+            col = box.column(align=True)
+            row = col.row(align=True)
+            row.prop(settings, 'show_stats', emboss=False,
+                     icon='TRIA_DOWN' if settings.show_stats else 'TRIA_RIGHT')
+            row.operator('librarian.reset_stats', text="", icon='X')
+            if settings.show_stats:
+                # Figures of the previous draws, this one is only recorded after the panel is laid out
+                stats = draw_stats()
+                if stats['draw']['samples']:
+                    col.label(text="Draw: p50 {:.2f} ms, p95 {:.2f} ms  (last {} draws)".format(
+                        stats['draw']['p50_ms'], stats['draw']['p95_ms'], stats['draw']['samples']))
+                for name, phase in sorted(stats['phases'].items()):
+                    col.label(text="{}: last {:.2f} ms, mean {:.2f} ms, {:,} calls".format(
+                        name.capitalize(), phase['last_ms'], phase['mean_ms'], phase['calls']))
+                for name, value in sorted(stats['counters'].items()):
+                    col.label(text="{}: {:,}".format(name.replace('_', ' ').capitalize(), value))
 
         addon_updater_ops.update_notice_box_ui(self, context)
 
+        draw_end = time.perf_counter()
+        hot_path_stats.add_time('layout', draw_end - layout_start)
+        hot_path_stats.record_draw(draw_end - draw_start)
+        hot_path_stats.count('labels_emitted', labels)
+
 
 classes = [
+    LibrarianRemapRule,
     LibrarianPrefs,
+    LibrarianLibrary,
     LibrarianSettings,
     LIBRARIAN_OT_expand,
+    LIBRARIAN_OT_expand_all,
+    LIBRARIAN_OT_expand_node,
+    LIBRARIAN_OT_page,
     LIBRARIAN_OT_reload,
+    LIBRARIAN_OT_reload_changed,
+    LIBRARIAN_OT_footprint,
+    LIBRARIAN_OT_export_report,
+    LIBRARIAN_OT_profile_reload,
+    LIBRARIAN_OT_export_profile,
+    LIBRARIAN_OT_reset_stats,
+    LIBRARIAN_OT_remap_rule_add,
+    LIBRARIAN_OT_remap_rule_remove,
+    LIBRARIAN_OT_remap_rule_move,
+    LIBRARIAN_OT_remap,
+    LIBRARIAN_OT_scan_folder,
     LIBRARIAN_OT_importblend,
     LIBRARIAN_PT_libraries
 ]
@@ -342,8 +1891,34 @@ def register():
 
     bpy.types.Scene.librarian_settings = bpy.props.PointerProperty(type=LibrarianSettings)
 
+    build_id_types()
+    build_id_registry()
+    for handler_list, handler in handlers:
+        handler_list.append(handler)
+    linked_index.clear()
+
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon is not None:
+        library_watcher.interval = addon.preferences.watch_interval
+        snapshot_state['interval'] = addon.preferences.snapshot_interval / 1000
+    library_watcher.start()
+    open_manifest_cache()
+
 
 def unregister():
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+    if bpy.app.timers.is_registered(snapshot_timer):
+        bpy.app.timers.unregister(snapshot_timer)
+    linked_index.clear()
+    library_watcher.stop()
+    file_stats.shutdown()
+    for cache in manifest_caches.values():
+        cache.close()
+    manifest_caches.clear()
+    library_users_cache['cache'] = None
+
     del bpy.types.Scene.librarian_settings
 
     from bpy.utils import unregister_class
@@ -0,0 +1,163 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+# pyright: reportMissingImports=false
+
+"""Headless link reports for many .blend files at once.
+
+Inside Blender, emit_report() prints the library -> datablock report of the open file as JSON:
+
+    blender -b shot.blend --python-expr "import librarian.audit; librarian.audit.emit_report()"
+
+Outside Blender, this file is the driver that runs that for a whole list of files or folders
+on a pool of background Blender instances, and streams the results into one JSON Lines report:
+
+    python audit.py --blender /path/to/blender --jobs 8 --output report.jsonl /projects/shots
+
+With --no-blender, files are read with the pure Python reader in blendfile.py instead, which is much faster but
+only sees the datablocks each file links directly.
+
+This module must stay importable without bpy, so anything that needs Blender is imported inside emit_report().
+"""
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+
+REPORT_PREFIX = "LIBRARIAN_REPORT:"  # Marks our line among everything else Blender prints
+
+
+def emit_report():
+    """ Print the report of the file open in Blender. Run inside Blender, e.g. through --python-expr """
+    from . import linked_data_report
+    print(REPORT_PREFIX + json.dumps(linked_data_report()))
+    sys.stdout.flush()
+
+
+def addon_import_expr(module='audit', call="emit_report()"):
+    """ Python expression that makes Blender import a module of this add-on from where it is on disk and make a
+        call from it (by default, emit the report), so it works whether or not the add-on is installed in that Blender """
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    return ("import sys, importlib; sys.path.insert(0, {!r}); importlib.import_module({!r}).{}"
+            .format(os.path.dirname(addon_dir), os.path.basename(addon_dir) + "." + module, call))
+
+
+def find_blend_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for f in sorted(files):
+                    if f.lower().endswith(".blend"):
+                        yield os.path.join(root, f)
+        else:
+            yield path
+
+
+def audit_file(blender, filepath, timeout=None, expr=None):
+    """ Open one file in a background Blender and return its report, or a dict with an 'error'.
+        expr is the Python expression printing the report, emit_report() by default """
+    cmd = [blender, "-b", "--factory-startup", filepath,
+           "--python-exit-code", "2",
+           "--python-expr", expr or addon_import_expr()]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return {'file': filepath, 'error': str(e)}
+
+    for line in proc.stdout.splitlines():
+        if line.startswith(REPORT_PREFIX):
+            report = json.loads(line[len(REPORT_PREFIX):])
+            report['file'] = filepath  # As given, rather than how Blender normalized it
+            return report
+
+    error = proc.stderr.strip().splitlines()
+    return {'file': filepath, 'error': error[-1] if error else "Blender exited with code {}".format(proc.returncode)}
+
+
+def read_file(filepath):
+    """ Report of one file from the pure Python reader, or a dict with an 'error' """
+    try:
+        from . import blendfile
+    except ImportError:
+        import blendfile  # Running as a script, next to blendfile.py
+    try:
+        return blendfile.read_links(filepath)
+    except (OSError, ValueError, struct.error, blendfile.BlendFileError) as e:
+        return {'file': filepath, 'error': str(e)}
+
+
+def run_audit(blender, files, jobs, out, timeout=None, progress=None, expr=None):
+    """ Audit the files on up to `jobs` Blender instances at once, writing each report to `out` as soon as it's
+        done (in completion order) so that reports never pile up in memory. Returns the number of failed files.
+        expr is passed on to audit_file(), to run something else than emit_report() in each file.
+        If blender is None, the files are read by the pure Python reader on a process pool instead """
+    failed = 0
+    if blender is None:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+    else:
+        pool = ThreadPoolExecutor(max_workers=jobs)  # The threads only wait for their Blender process
+    with pool:
+        if blender is None:
+            futures = [pool.submit(read_file, f) for f in files]
+        else:
+            futures = [pool.submit(audit_file, blender, f, timeout, expr) for f in files]
+        for i, future in enumerate(as_completed(futures)):
+            report = future.result()
+            if 'error' in report:
+                failed += 1
+            out.write(json.dumps(report) + "\n")
+            out.flush()
+            if progress is not None:
+                progress(i + 1, len(futures), report)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the linked libraries and datablocks of many .blend files")
+    parser.add_argument('paths', nargs='+', help=".blend files, or folders to search for them")
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', "blender"), help="Blender executable")
+    parser.add_argument('--no-blender', action='store_true',
+                        help="Read the files directly instead of opening them in Blender (direct links only)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="Blender instances to run at once")
+    parser.add_argument('-o', '--output', help="JSON Lines file to write (default: stdout)")
+    parser.add_argument('--timeout', type=float, default=None, help="Seconds to wait for each file")
+    args = parser.parse_args(argv)
+
+    files = list(find_blend_files(args.paths))
+    blender = None if args.no_blender else args.blender
+
+    def progress(done, total, report):
+        status = "FAILED: " + report['error'] if 'error' in report else "{} libraries".format(len(report['libraries']))
+        print("[{}/{}] {} - {}".format(done, total, report['file'], status), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            failed = run_audit(blender, files, max(1, args.jobs), out, args.timeout, progress)
+    else:
+        failed = run_audit(blender, files, max(1, args.jobs), sys.stdout, args.timeout, progress)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+import fake_bpy
+
+
+bpy = fake_bpy.install()
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_addon():
+    """ Import the add-on from this checkout as the package 'librarian', whatever its folder is called """
+    spec = importlib.util.spec_from_file_location(
+        "librarian", os.path.join(ADDON_DIR, "__init__.py"), submodule_search_locations=[ADDON_DIR])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules["librarian"] = addon
+    spec.loader.exec_module(addon)
+    addon.addon_updater_ops.updater.invalidupdater = True  # Never check for updates from a benchmark
+    return addon
+
+
+librarian = import_addon()
+
+# name -> (libraries, datablocks per library, datablock types, local datablocks)
+SHAPES = {
+    'grid': (20, 500, 8, 10000),
+    'tiny_libraries': (2000, 3, 3, 2000),
+    'giant_library': (1, 50000, 12, 0),
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption('--shape', action='append', default=[], metavar="NAME=LIBSxIDSxTYPES[xLOCAL]",
+                     help="Also benchmark bpy.data with this many libraries, datablocks per library, types "
+                          "and local datablocks, e.g. --shape huge=100x5000x12x50000")
+
+
+def pytest_generate_tests(metafunc):
+    if 'shape' in metafunc.fixturenames:
+        shapes = dict(SHAPES)
+        for option in metafunc.config.getoption('shape'):
+            name, _, sizes = option.partition("=")
+            sizes = [int(s) for s in sizes.split("x")]
+            shapes[name] = tuple(sizes + [0] * (4 - len(sizes)))
+        metafunc.parametrize('shape', list(shapes.items()), ids=list(shapes))
+
+
+@pytest.fixture
+def blend_data(shape):
+    """ Fill bpy.data with the given shape and start from an empty index, as after loading a file """
+    name, (num_libraries, ids_per_library, num_types, local_ids) = shape
+    bpy.data = fake_bpy.make_blend_data(num_libraries, ids_per_library, num_types, local_ids)
+    librarian.build_id_types()
+    librarian.build_id_registry()
+    librarian.linked_index.clear()
+    librarian.clear_scene_usage()
+    librarian.hot_path_stats.reset()
+    yield bpy.data
+    librarian.linked_index.clear()
@@ -0,0 +1,248 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""Just enough of bpy to import Librarian and run its scan, group and draw code outside Blender.
+
+install() puts fake bpy, bpy_extras and addon_utils modules in sys.modules. make_blend_data() then fills
+bpy.data with synthetic libraries and datablocks, e.g. 20 libraries of 500 datablocks each spread over 8 types.
+Only what Librarian reads is faked: RNA has identifiers, names and bases, datablocks have a name and a library,
+and layouts accept any call and draw nothing.
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+
+class RNAStruct():
+    def __init__(self, identifier, name, base=None):
+        self.identifier = identifier
+        self.name = name
+        self.base = base
+
+
+class RNAProperty():
+    def __init__(self, identifier, fixed_type):
+        self.identifier = identifier
+        self.type = 'COLLECTION'
+        self.fixed_type = fixed_type
+
+
+class ID():
+    bl_rna = RNAStruct('ID', "ID")
+
+    def __init__(self, name, library=None):
+        self.name = name
+        self.library = library
+
+    def __repr__(self):
+        return "<{} {!r}>".format(type(self).__name__, self.name)
+
+    @property
+    def original(self):
+        return self  # Datablocks are their own evaluated copies
+
+
+class Library(ID):
+    bl_rna = RNAStruct('Library', "Library", ID.bl_rna)
+
+    def __init__(self, name, filepath, parent=None):
+        super().__init__(name)
+        self.filepath = filepath
+        self.parent = parent
+
+
+def id_class(identifier, base=ID):
+    return type(identifier, (base,), {'bl_rna': RNAStruct(identifier, identifier, base.bl_rna)})
+
+
+NodeTree = id_class('NodeTree')
+Texture = id_class('Texture')
+Light = id_class('Light')
+
+# (bpy.data attribute, class of its datablocks, base class the collection is declared to hold if not ID itself)
+ID_COLLECTIONS = [(attr, id_class(identifier, base), base)
+                  for attr, identifier, base in (
+                      ('objects', 'Object', ID),
+                      ('meshes', 'Mesh', ID),
+                      ('materials', 'Material', ID),
+                      ('node_groups', 'ShaderNodeTree', NodeTree),
+                      ('images', 'Image', ID),
+                      ('collections', 'Collection', ID),
+                      ('actions', 'Action', ID),
+                      ('textures', 'ImageTexture', Texture),
+                      ('lights', 'PointLight', Light),
+                      ('cameras', 'Camera', ID),
+                      ('curves', 'Curve', ID),
+                      ('worlds', 'World', ID),
+                  )]
+
+ICONS = ['NONE', 'QUESTION', 'BLANK1', 'OBJECT_DATA', 'MESH_DATA', 'MATERIAL', 'NODETREE', 'IMAGE_DATA',
+         'OUTLINER_COLLECTION', 'ACTION', 'TEXTURE', 'LIGHT_DATA', 'CAMERA_DATA', 'CURVE_DATA', 'WORLD',
+         'LIBRARY_DATA_DIRECT', 'LIBRARY_DATA_INDIRECT']
+
+
+class BlendData():
+    bl_rna = RNAStruct('BlendData', "Blend-File Data")
+
+    def __init__(self):
+        self.filepath = ""
+        self.libraries = []
+        self.window_managers = []  # No UI to redraw
+        for attr, cls, base in ID_COLLECTIONS:
+            setattr(self, attr, [])
+
+    def user_map(self, subset=None, key_types=None, value_types=None):
+        ids = subset if subset is not None else [d for attr, cls, base in ID_COLLECTIONS for d in getattr(self, attr)]
+        return {d: set() for d in ids}
+
+
+BlendData.bl_rna.properties = [RNAProperty('libraries', Library.bl_rna)] + [
+    RNAProperty(attr, (cls if base is ID else base).bl_rna) for attr, cls, base in ID_COLLECTIONS]
+
+
+class Anything():
+    """ Accepts any attribute being set or read, and any call """
+
+    def __getattr__(self, name):
+        return Anything()
+
+    def __call__(self, *args, **kwargs):
+        return Anything()
+
+
+class UILayout():
+    """ Counts what is drawn into it instead of drawing it """
+
+    bl_rna = RNAStruct('UILayout', "UI Layout")
+    bl_rna.functions = {'label': types.SimpleNamespace(parameters={
+        'icon': types.SimpleNamespace(enum_items={icon: None for icon in ICONS})})}
+
+    def __init__(self, counts=None):
+        self.counts = counts if counts is not None else {'items': 0}
+
+    def sublayout(self, *args, **kwargs):
+        return UILayout(self.counts)
+
+    row = column = box = split = sublayout
+
+    def item(self, *args, **kwargs):
+        self.counts['items'] += 1
+        return Anything()
+
+    label = prop = operator = separator = item
+
+
+def prop(**kwargs):
+    return ('Property', kwargs)
+
+
+def persistent(func):
+    return func
+
+
+class Timers():
+    """ Registered timers are kept but never run, benchmarks call what they need themselves.
+        Like Blender, timers are told apart by function object, so two bound methods of the same method differ """
+
+    def __init__(self):
+        self.functions = {}  # id(function) -> (function, first interval)
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        self.functions[id(function)] = (function, first_interval)
+
+    def unregister(self, function):
+        if id(function) not in self.functions:
+            raise ValueError("Error: function is not registered")
+        del self.functions[id(function)]
+
+    def is_registered(self, function):
+        return id(function) in self.functions
+
+
+def abspath(path, library=None):
+    if path.startswith("//"):
+        base = library.filepath if library is not None else sys.modules['bpy'].data.filepath
+        return os.path.join(os.path.dirname(abspath(base)), path[2:])
+    return path
+
+
+def module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    return mod
+
+
+def install(version=(2, 93, 0)):
+    """ Make `import bpy` (and what Librarian and its updater import alongside it) load the fakes """
+    config = tempfile.mkdtemp(prefix="librarian_bench_")
+
+    def user_resource(resource_type, path="", create=False):
+        folder = os.path.join(config, resource_type.lower(), path)
+        if create:
+            os.makedirs(folder, exist_ok=True)
+        return folder
+
+    handlers = module('bpy.app.handlers', persistent=persistent, **{name: [] for name in (
+        'load_post', 'undo_post', 'redo_post', 'depsgraph_update_post', 'save_post', 'scene_update_post')})
+    app = module('bpy.app', version=version, handlers=handlers, timers=Timers(), background=True)
+    bpy_types = module('bpy.types', ID=ID, Library=Library, BlendData=BlendData, UILayout=UILayout,
+                       **{name: type(name, (), {}) for name in (
+                           'Operator', 'Panel', 'PropertyGroup', 'AddonPreferences', 'Scene',
+                           'OperatorFileListElement')})
+    for cls in (NodeTree, Texture, Light):
+        setattr(bpy_types, cls.__name__, cls)
+    for attr, cls, base in ID_COLLECTIONS:
+        setattr(bpy_types, cls.__name__, cls)
+    props = module('bpy.props', **{name: prop for name in (
+        'BoolProperty', 'IntProperty', 'FloatProperty', 'StringProperty', 'EnumProperty',
+        'PointerProperty', 'CollectionProperty')})
+    utils = module('bpy.utils', register_class=lambda cls: None, unregister_class=lambda cls: None,
+                   user_resource=user_resource, refresh_script_paths=lambda: None)
+    path = module('bpy.path', abspath=abspath, basename=lambda p: os.path.basename(p[2:] if p.startswith("//") else p))
+    bpy = module('bpy', app=app, types=bpy_types, props=props, utils=utils, path=path,
+                 data=BlendData(), context=Anything())
+
+    io_utils = module('bpy_extras.io_utils', ImportHelper=type('ImportHelper', (), {}),
+                      ExportHelper=type('ExportHelper', (), {}))
+    module('bpy_extras', io_utils=io_utils)
+    module('addon_utils', modules=lambda *args, **kwargs: [], paths=lambda: [])
+    return bpy
+
+
+def make_blend_data(num_libraries, ids_per_library, num_types, local_ids=0, indirect=0.0):
+    """ A BlendData whose libraries each link ids_per_library datablocks, spread evenly over the first num_types
+        datablock types. local_ids datablocks that aren't linked are spread over the same types, and the given
+        fraction of the libraries are made indirect, linked by the library before them """
+    data = BlendData()
+    data.filepath = "/project/shot.blend"
+    collections = ID_COLLECTIONS[:max(1, min(num_types, len(ID_COLLECTIONS)))]
+    num_indirect = int(num_libraries * indirect)
+    for i in range(num_libraries):
+        parent = data.libraries[i - 1] if i >= num_libraries - num_indirect and i > 0 else None
+        lib = Library("lib{:05d}.blend".format(i), "//libs/lib{:05d}.blend".format(i), parent)
+        data.libraries.append(lib)
+        for j in range(ids_per_library):
+            attr, cls, base = collections[j % len(collections)]
+            getattr(data, attr).append(cls("{}.{:05d}.{:06d}".format(cls.__name__, i, j), lib))
+    for j in range(local_ids):
+        attr, cls, base = collections[j % len(collections)]
+        getattr(data, attr).append(cls("Local{}.{:06d}".format(cls.__name__, j)))
+    return data
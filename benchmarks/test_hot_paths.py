@@ -0,0 +1,179 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""Timings of Librarian's hot paths on synthetic bpy.data, run with:
+
+    python -m pytest benchmarks
+
+Every benchmark runs once per shape in conftest.SHAPES, plus any given with --shape.
+"""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import fake_bpy
+from conftest import bpy, librarian
+
+
+def make_context(expanded, view_mode='LIST', filter_text="", search="", scene_only=False):
+    settings = SimpleNamespace(
+        libraries=[SimpleNamespace(name=lib.name, expanded=expanded, page=0) for lib in bpy.data.libraries],
+        filter_text=filter_text,
+        sort_mode='TYPE',
+        view_mode=view_mode,
+        search=search,
+        show_profile=False,
+        show_stats=False,
+        show_remap=False,
+        scene_only=scene_only,
+        )
+    prefs = SimpleNamespace(page_size=50, huge_library_size=500, show_stats=False, remap_rules=[])
+    scene = SimpleNamespace(name="Scene", librarian_settings=settings)
+    view_layer = SimpleNamespace(name="ViewLayer")
+    # Every other linked datablock is used by the scene
+    depsgraph = SimpleNamespace(scene=scene, view_layer=view_layer, updates=[],
+                                ids=list(librarian.get_linked_data())[::2])
+    context = SimpleNamespace(
+        scene=scene,
+        view_layer=view_layer,
+        evaluated_depsgraph_get=lambda: depsgraph,
+        preferences=SimpleNamespace(addons={"librarian": SimpleNamespace(preferences=prefs)}),
+        )
+    bpy.context = context  # What timers see
+    return context
+
+
+def num_linked(data):
+    return sum(1 for attr, cls, base in fake_bpy.ID_COLLECTIONS for d in getattr(data, attr) if d.library)
+
+
+def draw_panel(context):
+    panel = librarian.LIBRARIAN_PT_libraries()
+    panel.layout = fake_bpy.UILayout()
+    panel.draw(context)
+    return panel.layout.counts['items']
+
+
+def test_get_linked_data(benchmark, blend_data):
+    ids = benchmark(lambda: list(librarian.get_linked_data()))
+    assert len(ids) == num_linked(blend_data)
+
+
+def test_count_types(benchmark, blend_data):
+    ids = list(librarian.get_linked_data())
+    counts = benchmark(librarian.count_types, ids)
+    assert sum(counts.values()) == len(ids)
+
+
+def test_type_icon(benchmark, blend_data):
+    categories = [librarian.id_type_info(d)[0] for d in librarian.get_linked_data()]
+    icons = benchmark(lambda: [librarian.type_icon(t) for t in categories])
+    assert 'QUESTION' not in icons
+
+
+def test_scan(benchmark, blend_data):
+    """ Grouping every datablock collection by library, as after loading a file """
+    index = librarian.LinkedDataIndex()
+
+    def scan():
+        for coll in librarian.id_collections():
+            index.scan_collection(coll.attr)
+
+    benchmark(scan)
+
+
+def test_group(benchmark, blend_data):
+    """ Merging the scanned collections into one entry per library """
+    index = librarian.LinkedDataIndex()
+    for coll in librarian.id_collections():
+        index.scan_collection(coll.attr)
+    benchmark(index.merge)
+    assert sum(len(entry.ids) for entry in index.libraries.values()) == num_linked(blend_data)
+
+
+def test_rebuild(benchmark, blend_data):
+    """ Scan and group together, as when the index is dirty """
+
+    def rebuild():
+        librarian.linked_index.dirty = True
+        librarian.linked_index.update()
+
+    benchmark(rebuild)
+
+
+@pytest.mark.parametrize('expanded', [False, True], ids=['collapsed', 'expanded'])
+def test_draw(benchmark, blend_data, expanded):
+    """ Redrawing the panel from an up to date index, which is what happens on every mouse move over it """
+    librarian.linked_index.update()
+    context = make_context(expanded)
+    librarian.snapshot_timer()  # Builds the library graph, as it would after a change in Blender
+    draw_panel(context)  # The first draw also builds the per-library views
+    items = benchmark(draw_panel, context)
+    assert items >= len(bpy.data.libraries)
+
+
+def test_draw_filtered(benchmark, blend_data):
+    """ Typing in the filter box, so that every expanded library's list is filtered again on each draw """
+    librarian.linked_index.update()
+    contexts = [make_context(True, filter_text=text) for text in ("0", "00", "000")]
+    state = {'i': 0}
+
+    def draw_next():
+        state['i'] += 1
+        return draw_panel(contexts[state['i'] % len(contexts)])
+
+    benchmark(draw_next)
+
+
+def test_draw_scene_only(benchmark, blend_data):
+    """ A depsgraph update, then the snapshot finding what the scene uses, then drawing only that """
+    librarian.linked_index.update()
+    context = make_context(True, scene_only=True)
+
+    def draw_after_update():
+        librarian.librarian_depsgraph_update_post(context.scene, context.evaluated_depsgraph_get())
+        librarian.snapshot_timer()
+        return draw_panel(context)
+
+    benchmark(draw_after_update)
+    assert sum(len(ids) for ids in librarian.scene_usage['used'].values()) == (num_linked(blend_data) + 1) // 2
+
+
+def test_search(benchmark, blend_data):
+    """ Drawing the panel with a search across all libraries """
+    librarian.linked_index.update()
+    context = make_context(False, search="mesh.0")
+    draw_panel(context)  # Builds the name index
+    benchmark(draw_panel, context)
+
+
+@pytest.mark.parametrize('file_format', ['CSV', 'JSONL'])
+def test_export(benchmark, blend_data, file_format):
+    """ Streaming the library report, into memory so that disk speed doesn't count """
+    librarian.linked_index.update()
+
+    def export():
+        return librarian.write_records(io.StringIO(), librarian.export_records(), file_format)
+
+    n = benchmark(export)
+    assert n == len(bpy.data.libraries) + num_linked(blend_data) + sum(
+        len(entry.type_counts) for entry in librarian.linked_index.libraries.values())
@@ -0,0 +1,462 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""List the libraries a .blend file links and the datablocks it links from them, without Blender.
+
+The file is memory-mapped and only the block headers are walked. The bodies of all blocks are skipped
+except for the library blocks ('LI'), the linked datablock placeholders that follow them ('ID') and the
+struct definitions at the end of the file ('DNA1'), which say where the names are inside those blocks.
+
+Compressed files are decompressed as a stream that stops at the DNA1 block, and skipped blocks are thrown
+away as they are inflated. Zstd files written by Blender 3.0+ have a seek table of independently compressed
+frames; with it, only the frames holding block headers and the blocks that are needed get decompressed.
+
+The result has the same shape as Librarian's linked_data_report(). Only datablocks linked directly by the
+file are stored in it though; ones linked indirectly through other libraries are only found by Blender
+when it reads those libraries.
+
+Can be run as a script to print the links of files as JSON Lines:
+
+    python blendfile.py shot_010.blend shot_020.blend
+"""
+
+import bisect
+import gzip
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+
+
+class BlendFileError(Exception):
+    pass
+
+
+# Two letter ID codes at the start of datablock names -> RNA identifier of the type, as in Librarian's reports
+ID_CODES = {
+    'AC': 'Action',
+    'AR': 'Armature',
+    'BR': 'Brush',
+    'CA': 'Camera',
+    'CF': 'CacheFile',
+    'CU': 'Curve',
+    'CV': 'Curves',
+    'GR': 'Collection',
+    'IM': 'Image',
+    'KE': 'Key',
+    'LA': 'Light',
+    'LI': 'Library',
+    'LP': 'LightProbe',
+    'LS': 'FreestyleLineStyle',
+    'LT': 'Lattice',
+    'MA': 'Material',
+    'MB': 'MetaBall',
+    'MC': 'MovieClip',
+    'ME': 'Mesh',
+    'MS': 'Mask',
+    'NT': 'NodeTree',
+    'OB': 'Object',
+    'PA': 'ParticleSettings',
+    'PC': 'PaintCurve',
+    'PL': 'Palette',
+    'PT': 'PointCloud',
+    'SC': 'Scene',
+    'SK': 'Speaker',
+    'SO': 'Sound',
+    'SR': 'Screen',
+    'TE': 'Texture',
+    'TX': 'Text',
+    'VF': 'VectorFont',
+    'VO': 'Volume',
+    'WM': 'WindowManager',
+    'WO': 'World',
+    'WS': 'WorkSpace',
+}
+
+
+def id_type(code, version):
+    """ RNA identifier of an ID code. Grease pencil types were renamed when the new grease pencil replaced the old """
+    if code == 'GD':
+        return 'Annotation' if version >= 500 else 'GreasePencil'
+    if code == 'GP':
+        return 'GreasePencil' if version >= 500 else 'GreasePencilv3'
+    return ID_CODES.get(code, code)
+
+
+class BlendHeader():
+    """ The file header, which says how everything after it is encoded """
+
+    def __init__(self, buf):
+        magic = bytes(buf[:7])
+        if magic != b"BLENDER":
+            raise BlendFileError("Not a .blend file")
+
+        if bytes(buf[7:9]).isdigit():
+            # Blender 5.0+: "BLENDER17-01v0500", header size, pointer size, file format version, endianness, version
+            self.size = int(bytes(buf[7:9]))
+            pointer_char = bytes(buf[9:10])
+            self.format_version = int(bytes(buf[10:12]))
+            endian_char = bytes(buf[12:13])
+            self.version = int(bytes(buf[13:self.size]))
+        else:
+            # "BLENDER-v293": pointer size, endianness, version
+            self.size = 12
+            pointer_char = bytes(buf[7:8])
+            self.format_version = 0
+            endian_char = bytes(buf[8:9])
+            self.version = int(bytes(buf[9:12]))
+
+        if pointer_char not in (b"_", b"-") or endian_char not in (b"v", b"V"):
+            raise BlendFileError("Unknown .blend header")
+        self.pointer_size = 4 if pointer_char == b"_" else 8
+        self.endian = "<" if endian_char == b"v" else ">"
+
+        if self.format_version == 0:
+            # code, len, old pointer, SDNAnr, nr
+            pointer_format = "I" if self.pointer_size == 4 else "Q"
+            self.bhead = struct.Struct(self.endian + "4si" + pointer_format + "ii")
+            self.bhead_len = 1
+        elif self.format_version == 1:
+            # code, SDNAnr, old pointer, len, nr
+            self.bhead = struct.Struct(self.endian + "4siQqq")
+            self.bhead_len = 3
+        else:
+            raise BlendFileError("Unsupported .blend file format version {}".format(self.format_version))
+
+
+class SDNA():
+    """ Struct layouts from the DNA1 block: struct name -> {field name: (offset, size)} """
+
+    def __init__(self, buf, offset, endian, pointer_size):
+        self.structs = {}
+        start = offset
+        offset = [offset]
+
+        def expect(tag):
+            if bytes(buf[offset[0]:offset[0] + 4]) != tag:
+                raise BlendFileError("Broken DNA1 block, expected " + tag.decode())
+            offset[0] += 4
+
+        def read_int():
+            value = struct.unpack_from(endian + "i", buf, offset[0])[0]
+            offset[0] += 4
+            return value
+
+        def read_strings(count):
+            strings = []
+            for i in range(count):
+                end = buf.find(b"\0", offset[0])
+                if end < 0:
+                    raise BlendFileError("Broken DNA1 block, unterminated name")
+                strings.append(bytes(buf[offset[0]:end]).decode('latin-1'))
+                offset[0] = end + 1
+            return strings
+
+        def align():
+            # Relative to the start of the block, which Blender has in 4 byte aligned memory when it reads it
+            offset[0] = start + ((offset[0] - start + 3) & ~3)
+
+        expect(b"SDNA")
+        expect(b"NAME")
+        names = read_strings(read_int())
+        align()
+        expect(b"TYPE")
+        types = read_strings(read_int())
+        align()
+        expect(b"TLEN")
+        lengths = struct.unpack_from(endian + "{}h".format(len(types)), buf, offset[0])
+        offset[0] += 2 * len(types)
+        align()
+        expect(b"STRC")
+        for i in range(read_int()):
+            type_index, num_fields = struct.unpack_from(endian + "hh", buf, offset[0])
+            fields = struct.unpack_from(endian + "{}h".format(2 * num_fields), buf, offset[0] + 4)
+            offset[0] += 4 + 4 * num_fields
+
+            layout = {}
+            field_offset = 0
+            for j in range(num_fields):
+                name = names[fields[2 * j + 1]]
+                size = pointer_size if name.startswith(("*", "(*")) else lengths[fields[2 * j]]
+                for dim in re.findall(r"\[(\d+)\]", name):
+                    size *= int(dim)
+                layout[field_name(name)] = (field_offset, size)
+                field_offset += size
+            self.structs[types[type_index]] = layout
+
+    def field(self, struct_name, name):
+        try:
+            return self.structs[struct_name][name]
+        except KeyError:
+            raise BlendFileError("{}.{} not found in the file's struct definitions".format(struct_name, name))
+
+
+def field_name(name):
+    """ 'name[66]' -> 'name', '*next' -> 'next', '(*func)()' -> 'func' """
+    return re.sub(r"\[.*", "", name.replace("(", "").replace(")", "").lstrip("*"))
+
+
+def c_string(buf, offset, size):
+    raw = bytes(buf[offset:offset + size])
+    return raw.split(b"\0", 1)[0].decode('utf-8', 'replace')
+
+
+def parse_blocks(buf, header):
+    """ Walk the block headers and return the library and placeholder blocks in file order as
+        (code, body offset, body size), plus the body offset and size of the DNA1 block """
+    offset = header.size
+    bhead = header.bhead
+    unpack = bhead.unpack_from
+    len_index = header.bhead_len
+    end = len(buf)
+    blocks = []
+    dna = None
+    while offset + bhead.size <= end:
+        fields = unpack(buf, offset)
+        code = fields[0]
+        size = fields[len_index]
+        body = offset + bhead.size
+        if code == b"ENDB":
+            break
+        if code in (b"LI\0\0", b"ID\0\0"):
+            blocks.append((code, body, size))
+        elif code == b"DNA1":
+            dna = (body, size)
+        offset = body + size
+    if dna is None:
+        raise BlendFileError("No DNA1 block, the file is truncated or damaged")
+    return blocks, dna
+
+
+def make_report(header, sdna, blocks, filepath):
+    """ Decode the library and placeholder blocks, given as (code, buffer, body offset) in file order """
+    id_name = sdna.field('ID', 'name')
+    library = sdna.structs.get('Library', {})
+    # Before 2.93, Library.name was the path as linked and Library.filepath the absolute path made from it
+    lib_path = sdna.field('Library', 'name' if 'name' in library else 'filepath')
+
+    blend_dir = os.path.dirname(os.path.abspath(filepath))
+    libraries = []
+    for code, buf, body in blocks:
+        if code == b"LI\0\0":
+            path = c_string(buf, body + lib_path[0], lib_path[1])
+            abspath = os.path.join(blend_dir, path[2:]) if path.startswith("//") else path
+            libraries.append({
+                'name': c_string(buf, body + id_name[0], id_name[1])[2:],
+                'filepath': path,
+                'abspath': os.path.normpath(abspath),
+                'indirect': False,  # Only direct libraries are read, as in linked_data_report(direct_only=True)
+                'ids': [],
+            })
+        elif libraries:
+            name = c_string(buf, body + id_name[0], id_name[1])
+            libraries[-1]['ids'].append({'type': id_type(name[:2], header.version), 'name': name[2:]})
+
+    return {
+        'file': filepath,
+        'libraries': libraries,
+    }
+
+
+def read_links_from_buffer(buf, filepath):
+    """ The libraries and linked datablocks of an uncompressed .blend file in memory (or mapped into it) """
+    header = BlendHeader(buf)
+    blocks, dna = parse_blocks(buf, header)
+    sdna = SDNA(buf, dna[0], header.endian, header.pointer_size)
+    return make_report(header, sdna, ((code, buf, body) for code, body, size in blocks), filepath)
+
+
+#####  Compressed files  #####
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+SEEKABLE_MAGIC = 0x8F92EAB1  # Last 4 bytes of a zstd file with a seek table, as written by Blender 3.0+
+SKIPPABLE_MAGIC = 0x184D2A5E
+SKIP_CHUNK = 1 << 20
+
+
+class StreamReader():
+    """ Sequential reads from a decompressing stream. Skipped bytes are decompressed and thrown away
+        a chunk at a time, so the file is never held in memory """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size):
+        data = self.stream.read(size)
+        while len(data) < size:
+            more = self.stream.read(size - len(data))
+            if not more:
+                break
+            data += more
+        return data
+
+    def skip(self, size):
+        while size > 0:
+            chunk = self.stream.read(min(size, SKIP_CHUNK))
+            if not chunk:
+                break
+            size -= len(chunk)
+
+
+class SeekableZstdReader():
+    """ Sequential reads from a zstd file made of independent frames, listed in a seek table at its end.
+        Only the frames that contain bytes that are actually read get decompressed, skipping over a big
+        block costs nothing """
+
+    def __init__(self, f, frames, zstandard):
+        self.f = f
+        self.frames = frames  # (compressed offset, compressed size, decompressed offset, decompressed size)
+        self.starts = [frame[2] for frame in frames]
+        self.decompressor = zstandard.ZstdDecompressor()
+        self.pos = 0
+        self.cached_index = -1  # Index of the frame in self.cached
+        self.cached = b""
+
+    @classmethod
+    def open(cls, f, zstandard):
+        """ A reader for f if it has a seek table, otherwise None """
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        if file_size < 17:
+            return None
+        f.seek(file_size - 9)
+        num_frames, descriptor, magic = struct.unpack("<IBI", f.read(9))
+        if magic != SEEKABLE_MAGIC:
+            return None
+        entry_size = 12 if descriptor & 0x80 else 8
+        table_size = num_frames * entry_size + 9
+        f.seek(file_size - table_size - 8)
+        skippable_magic, frame_size = struct.unpack("<II", f.read(8))
+        if skippable_magic != SKIPPABLE_MAGIC or frame_size != table_size:
+            return None
+
+        table = f.read(num_frames * entry_size)
+        frames = []
+        compressed = decompressed = 0
+        for i in range(num_frames):
+            compressed_size, decompressed_size = struct.unpack_from("<II", table, i * entry_size)
+            frames.append((compressed, compressed_size, decompressed, decompressed_size))
+            compressed += compressed_size
+            decompressed += decompressed_size
+        return cls(f, frames, zstandard)
+
+    def frame(self, index):
+        if index != self.cached_index:
+            offset, compressed_size, start, size = self.frames[index]
+            self.f.seek(offset)
+            self.cached = self.decompressor.decompress(self.f.read(compressed_size), max_output_size=size)
+            self.cached_index = index
+        return self.cached
+
+    def read(self, size):
+        parts = []
+        index = bisect.bisect_right(self.starts, self.pos) - 1
+        while size > 0 and 0 <= index < len(self.frames):
+            data = self.frame(index)
+            start = self.pos - self.frames[index][2]
+            part = data[start:start + size]
+            if not part:
+                break
+            parts.append(part)
+            self.pos += len(part)
+            size -= len(part)
+            index += 1
+        return b"".join(parts)
+
+    def skip(self, size):
+        self.pos += size
+
+
+def read_links_from_reader(reader, filepath):
+    """ The libraries and linked datablocks of a .blend file read sequentially. The bodies of the blocks that
+        aren't needed are skipped, and reading stops at the DNA1 block since only ENDB comes after it """
+    data = reader.read(12)
+    if len(data) == 12 and data[7:9].isdigit():
+        data += reader.read(int(data[7:9]) - 12)
+    header = BlendHeader(data)
+    bhead = header.bhead
+    len_index = header.bhead_len
+
+    blocks = []
+    sdna = None
+    while True:
+        data = reader.read(bhead.size)
+        if len(data) < bhead.size:
+            break
+        fields = bhead.unpack(data)
+        code = fields[0]
+        size = fields[len_index]
+        if code == b"ENDB":
+            break
+        if code in (b"LI\0\0", b"ID\0\0"):
+            blocks.append((code, reader.read(size), 0))
+        elif code == b"DNA1":
+            sdna = SDNA(reader.read(size), 0, header.endian, header.pointer_size)
+            break
+        else:
+            reader.skip(size)
+    if sdna is None:
+        raise BlendFileError("No DNA1 block, the file is truncated or damaged")
+    return make_report(header, sdna, blocks, filepath)
+
+
+def import_zstandard():
+    try:
+        import zstandard  # Bundled with Blender since 3.0
+    except ImportError:
+        raise BlendFileError("Reading zstd compressed .blend files needs the zstandard module")
+    return zstandard
+
+
+def read_links(filepath):
+    """ The libraries and linked datablocks of a .blend file, see the module docstring.
+        Uncompressed files are memory-mapped, gzip and zstd compressed files are decompressed as a stream """
+    with open(filepath, 'rb') as f:
+        magic = f.read(4)
+        if magic[:2] == GZIP_MAGIC:
+            f.seek(0)
+            with gzip.GzipFile(fileobj=f, mode='rb') as stream:
+                return read_links_from_reader(StreamReader(stream), filepath)
+        if magic == ZSTD_MAGIC:
+            zstandard = import_zstandard()
+            reader = SeekableZstdReader.open(f, zstandard)
+            if reader is not None:
+                return read_links_from_reader(reader, filepath)
+            f.seek(0)
+            with zstandard.ZstdDecompressor().stream_reader(f) as stream:
+                return read_links_from_reader(StreamReader(stream), filepath)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return read_links_from_buffer(buf, filepath)
+
+
+def main(argv=None):
+    failed = 0
+    for path in (sys.argv[1:] if argv is None else argv):
+        try:
+            report = read_links(path)
+        except (OSError, ValueError, struct.error, BlendFileError) as e:
+            report = {'file': path, 'error': str(e)}
+            failed += 1
+        print(json.dumps(report))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+# pyright: reportMissingImports=false
+
+"""Stat library files on a thread pool, so slow or missing network paths never block the UI.
+
+Paths are submitted from the main thread, the workers only call os.stat(), and the results are
+handed back to the main thread by a bpy.app.timers callback which also redraws the panel.
+
+LibraryWatcher builds on this to notice library files that changed on disk since they were loaded,
+by polling a few paths at a time on a timer.
+"""
+
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+
+
+POLL_INTERVAL = 0.2  # Seconds between checks for finished stats while any are pending
+
+
+class FileStat():
+    """ Result of stat-ing one file """
+
+    def __init__(self, path, size=0, mtime=0.0, missing=False, error=""):
+        self.path = path
+        self.size = size  # bytes
+        self.mtime = mtime
+        self.missing = missing
+        self.error = error  # Set if the file exists but couldn't be read, e.g. permission denied
+        self.checked = time.time()
+
+    def signature(self):
+        """ Changes when the file is modified, replaced or removed """
+        return (self.missing, self.size, self.mtime)
+
+
+def stat_file(path):
+    """ Runs on a worker thread """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return FileStat(path, missing=True)
+    except OSError as e:
+        return FileStat(path, error=str(e))
+    return FileStat(path, size=st.st_size, mtime=st.st_mtime)
+
+
+class FileStatCache():
+    """ Absolute path -> FileStat, filled in the background """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.executor = None
+        self.results = {}
+        self.pending = set()
+        self.finished = queue.SimpleQueue()  # FileStats handed from the workers to the main thread
+        self.listeners = []  # Called on the main thread with the list of new FileStats
+        # bpy.app.timers tells timers apart by function object, and every read of self.poll makes a new one
+        self.poll_timer = self.poll
+
+    def get(self, path):
+        return self.results.get(path)
+
+    def request(self, paths, force=False):
+        """ Stat the paths that haven't been yet (or all of them if force is set). Only call from the main thread """
+        submitted = False
+        for path in paths:
+            if path in self.pending or (not force and path in self.results):
+                continue
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix="librarian_stat")
+            self.pending.add(path)
+            self.executor.submit(self.run, path)
+            submitted = True
+
+        if submitted and not bpy.app.timers.is_registered(self.poll_timer):
+            # Persistent: paths still pending when a file is loaded aren't submitted again, so nothing else would
+            # register it again to collect them
+            bpy.app.timers.register(self.poll_timer, first_interval=POLL_INTERVAL, persistent=True)
+
+    def run(self, path):
+        self.finished.put(stat_file(path))
+
+    def poll(self):
+        """ Timer callback on the main thread: collect finished stats and redraw the panel """
+        new = []
+        while True:
+            try:
+                result = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(result.path)
+            self.results[result.path] = result
+            new.append(result)
+
+        if new:
+            for listener in self.listeners:
+                listener(new)
+            tag_redraw()
+
+        return POLL_INTERVAL if self.pending else None
+
+    def invalidate(self, path=None):
+        """ Forget one path or everything, so it gets stat-ed again when next requested """
+        if path is None:
+            self.results.clear()
+        else:
+            self.results.pop(path, None)
+
+    def shutdown(self):
+        if bpy.app.timers.is_registered(self.poll_timer):
+            bpy.app.timers.unregister(self.poll_timer)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        self.pending.clear()
+        self.results.clear()
+
+
+class LibraryWatcher():
+    """ Remembers the signature of each library file when it was loaded and flags the ones that changed since.
+        A timer re-stats a batch of the watched paths at a time, so a long list of libraries is covered over a few
+        intervals instead of all at once """
+
+    def __init__(self, stats, interval=5.0, batch_size=16):
+        self.stats = stats
+        self.interval = interval  # Seconds between batches
+        self.batch_size = batch_size
+        self.paths = []  # Library paths to watch, kept up to date by the add-on
+        self.next = 0  # Index in self.paths of the next batch
+        self.loaded = {}  # path -> signature of the file when it was loaded
+        self.stale = set()  # paths whose file changed since it was loaded
+        self.poll_timer = self.poll  # Same reason as FileStatCache.poll_timer
+        stats.listeners.append(self.on_stats)
+
+    def watch(self, paths):
+        self.paths = list(paths)
+
+    def on_stats(self, results):
+        for result in results:
+            if result.error:
+                continue
+            if result.path not in self.loaded:
+                self.loaded[result.path] = result.signature()
+            elif result.signature() != self.loaded[result.path]:
+                self.stale.add(result.path)
+            else:
+                self.stale.discard(result.path)
+
+    def is_stale(self, path):
+        return path in self.stale
+
+    def reset(self, path=None):
+        """ Take the next stat of the path (or of all paths) as its loaded state, e.g. after reloading it """
+        if path is None:
+            self.loaded.clear()
+            self.stale.clear()
+        else:
+            self.loaded.pop(path, None)
+            self.stale.discard(path)
+
+    def poll(self):
+        """ Timer callback: re-stat the next batch of watched paths """
+        if self.paths:
+            if self.next >= len(self.paths):
+                self.next = 0
+            batch = self.paths[self.next:self.next + self.batch_size]
+            self.next += len(batch)
+            self.stats.request(batch, force=True)
+        return self.interval
+
+    def start(self):
+        if not bpy.app.timers.is_registered(self.poll_timer):
+            bpy.app.timers.register(self.poll_timer, first_interval=self.interval, persistent=True)
+
+    def stop(self):
+        if bpy.app.timers.is_registered(self.poll_timer):
+            bpy.app.timers.unregister(self.poll_timer)
+        self.paths = []
+        self.reset()
+
+
+def tag_redraw():
+    for window_manager in bpy.data.window_managers:
+        for window in window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'PROPERTIES':
+                    area.tag_redraw()
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return "{:.0f} {}".format(size, unit) if unit == "B" else "{:.1f} {}".format(size, unit)
+        size /= 1024.0
+
+
+file_stats = FileStatCache()
+library_watcher = LibraryWatcher(file_stats)
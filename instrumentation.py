@@ -0,0 +1,98 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""Timers and counters for Librarian's hot paths, cheap enough to leave on all the time."""
+
+import time
+from collections import deque
+
+
+DRAW_WINDOW = 200  # Number of recent panel draws the percentiles are taken over
+
+
+class PhaseTimer():
+    """ Context manager adding the time spent inside it to one phase of HotPathStats """
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class HotPathStats():
+    """ Time spent per phase, event counters, and a rolling window of panel draw times """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases = {}  # phase name -> [calls, total seconds, last seconds]
+        self.counters = {}  # counter name -> count
+        self.draw_times = deque(maxlen=DRAW_WINDOW)
+
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    def add_time(self, name, seconds):
+        phase = self.phases.get(name)
+        if phase is None:
+            self.phases[name] = [1, seconds, seconds]
+        else:
+            phase[0] += 1
+            phase[1] += seconds
+            phase[2] = seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_draw(self, seconds):
+        self.draw_times.append(seconds)
+        self.add_time('draw', seconds)
+
+    def percentile(self, p):
+        """ p-th percentile (0-100) of the recent draw times in seconds, None before the first draw """
+        if not self.draw_times:
+            return None
+        ordered = sorted(self.draw_times)
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    def as_dict(self):
+        return {
+            'phases': {name: {
+                'calls': calls,
+                'total_ms': total * 1000,
+                'last_ms': last * 1000,
+                'mean_ms': total * 1000 / calls,
+            } for name, (calls, total, last) in self.phases.items()},
+            'counters': dict(self.counters),
+            'draw': {
+                'samples': len(self.draw_times),
+                'p50_ms': None if not self.draw_times else self.percentile(50) * 1000,
+                'p95_ms': None if not self.draw_times else self.percentile(95) * 1000,
+            },
+        }
+
+
+hot_path_stats = HotPathStats()
@@ -0,0 +1,206 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""On-disk cache of the libraries and linked datablocks of .blend files, kept between sessions.
+
+Each file's manifest (the report made by blendfile.read_links() or Librarian's linked_data_report()) is
+stored in SQLite, keyed by the file's absolute path together with its size and modification time. A file
+whose size and mtime haven't changed is never read again, so rescanning an unchanged project only costs
+one stat per file.
+
+Library paths are indexed too, so the cache also answers the reverse question of which files link a library.
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    error TEXT,
+    scanned REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS libraries (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    filepath TEXT NOT NULL,
+    abspath TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS libraries_file ON libraries(file_id);
+CREATE INDEX IF NOT EXISTS libraries_abspath ON libraries(abspath);
+CREATE TABLE IF NOT EXISTS ids (
+    library_id INTEGER NOT NULL REFERENCES libraries(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ids_library ON ids(library_id);
+"""
+
+
+def file_signature(path):
+    """ (size, mtime in ns) of a file, or None if it can't be stat-ed """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class ManifestCache():
+    """ Manifests of .blend files stored in an SQLite database in WAL mode """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self.generation = 0  # Incremented whenever manifests are stored or removed
+
+    def close(self):
+        self.db.close()
+
+    def signatures(self, paths=None):
+        """ path -> (size, mtime_ns) of the cached files, or only of the given paths """
+        if paths is None:
+            rows = self.db.execute("SELECT path, size, mtime_ns FROM files")
+            return {path: (size, mtime) for path, size, mtime in rows}
+        found = {}
+        paths = list(paths)
+        for i in range(0, len(paths), 500):  # Stay below SQLite's limit on query parameters
+            chunk = paths[i:i + 500]
+            rows = self.db.execute("SELECT path, size, mtime_ns FROM files WHERE path IN ({})".format(
+                ",".join("?" * len(chunk))), chunk)
+            for path, size, mtime in rows:
+                found[path] = (size, mtime)
+        return found
+
+    def paths_in(self, folder):
+        """ Cached files inside a folder or its subfolders, found through the index on the path column """
+        prefix = os.path.join(os.path.normpath(os.path.abspath(folder)), "")
+        rows = self.db.execute("SELECT path FROM files WHERE path >= ? AND path < ?", (prefix, prefix + "\uffff"))
+        return [path for path, in rows]
+
+    def is_current(self, path, signature):
+        return self.signatures([path]).get(path) == signature
+
+    def store(self, manifests):
+        """ Insert or replace the manifests of many files in one transaction.
+            Takes (path, (size, mtime_ns), report) tuples, where a report with an 'error' is stored as failed """
+        self.generation += 1
+        with self.db:
+            for path, signature, report in manifests:
+                self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+                cursor = self.db.execute(
+                    "INSERT INTO files (path, size, mtime_ns, error, scanned) VALUES (?, ?, ?, ?, ?)",
+                    (path, signature[0], signature[1], report.get('error'), time.time()))
+                file_id = cursor.lastrowid
+                for lib in report.get('libraries', ()):
+                    cursor = self.db.execute(
+                        "INSERT INTO libraries (file_id, name, filepath, abspath) VALUES (?, ?, ?, ?)",
+                        (file_id, lib['name'], lib['filepath'], lib['abspath']))
+                    library_id = cursor.lastrowid
+                    self.db.executemany("INSERT INTO ids (library_id, type, name) VALUES (?, ?, ?)",
+                                        ((library_id, d['type'], d['name']) for d in lib['ids']))
+
+    def invalidate(self, paths=None):
+        """ Forget the given files, or everything """
+        self.generation += 1
+        with self.db:
+            if paths is None:
+                self.db.execute("DELETE FROM files")
+            else:
+                self.db.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in paths))
+
+    def manifest(self, path):
+        """ The cached report of a file, or None """
+        row = self.db.execute("SELECT id, error FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        file_id, error = row
+        if error is not None:
+            return {'file': path, 'error': error}
+        libraries = []
+        for library_id, name, filepath, abspath in self.db.execute(
+                "SELECT id, name, filepath, abspath FROM libraries WHERE file_id = ? ORDER BY id", (file_id,)):
+            ids = [{'type': t, 'name': n} for t, n in self.db.execute(
+                "SELECT type, name FROM ids WHERE library_id = ? ORDER BY rowid", (library_id,))]
+            # Only direct libraries are stored, from blendfile.read_links() or linked_data_report(direct_only=True)
+            libraries.append({'name': name, 'filepath': filepath, 'abspath': abspath, 'indirect': False, 'ids': ids})
+        return {'file': path, 'libraries': libraries}
+
+    def users_of(self, library_path):
+        """ Files linking the library at this absolute path, as {file path: [names of the datablocks linked]} """
+        users = {}
+        rows = self.db.execute(
+            "SELECT files.path, ids.name FROM libraries "
+            "JOIN files ON files.id = libraries.file_id "
+            "LEFT JOIN ids ON ids.library_id = libraries.id "
+            "WHERE libraries.abspath = ? ORDER BY files.path", (os.path.normpath(library_path),))
+        for path, name in rows:
+            names = users.setdefault(path, [])
+            if name is not None:
+                names.append(name)
+        return users
+
+    def scan_folder(self, folder, read, jobs=4, batch_size=200):
+        """ Bring the cache up to date with the .blend files in a folder. Files whose size and mtime match the
+            cache are skipped, the others are read with read(path) on a few threads and stored in batches.
+            Returns (number of .blend files found, number that were read) """
+        found = {}
+        for root, dirs, files in os.walk(folder):
+            for f in files:
+                if f.lower().endswith(".blend"):
+                    path = os.path.normpath(os.path.abspath(os.path.join(root, f)))
+                    signature = file_signature(path)
+                    if signature is not None:
+                        found[path] = signature
+
+        cached = self.signatures(found.keys())
+        changed = [path for path, signature in found.items() if cached.get(path) != signature]
+
+        def read_one(path):
+            try:
+                return (path, found[path], read(path))
+            except Exception as e:
+                return (path, found[path], {'file': path, 'error': str(e)})
+
+        batch = []
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            for manifest in pool.map(read_one, changed):
+                batch.append(manifest)
+                if len(batch) >= batch_size:
+                    self.store(batch)
+                    batch = []
+        if batch:
+            self.store(batch)
+
+        # Files that were deleted from the folder since it was last scanned
+        gone = [path for path in self.paths_in(folder) if path not in found]
+        if gone:
+            self.invalidate(gone)
+
+        return len(found), len(changed)
@@ -0,0 +1,111 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""Timing history of library reloads, to find which libraries make reloading slow."""
+
+import json
+import os
+import time
+
+
+MAX_HISTORY = 20  # Reloads remembered per library
+
+
+def process_memory():
+    """ Resident memory of this process in bytes, or None if it can't be found out on this platform """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ReloadRecord():
+    """ Measurements of reloading one library once """
+
+    def __init__(self, path, seconds, num_ids, memory_delta):
+        self.path = path
+        self.seconds = seconds
+        self.num_ids = num_ids  # Datablocks linked from the library after the reload, None until counted
+        self.memory_delta = memory_delta  # bytes, None if unknown
+        self.time = time.time()
+
+    def as_dict(self):
+        return {
+            'path': self.path,
+            'seconds': self.seconds,
+            'num_ids': self.num_ids,
+            'memory_delta': self.memory_delta,
+            'time': self.time,
+        }
+
+
+class ReloadProfiler():
+    """ Library path -> history of ReloadRecords, newest last """
+
+    def __init__(self):
+        self.history = {}
+
+    def measure(self, path, reload):
+        """ Run reload() and record how long it took and how much memory it used. The caller fills in the
+            record's num_ids, so that reloading many libraries only counts their datablocks once at the end """
+        memory_before = process_memory()
+        start = time.perf_counter()
+        reload()
+        seconds = time.perf_counter() - start
+        memory_after = process_memory()
+
+        memory_delta = None
+        if memory_before is not None and memory_after is not None:
+            memory_delta = memory_after - memory_before
+        record = ReloadRecord(path, seconds, None, memory_delta)
+
+        records = self.history.setdefault(path, [])
+        records.append(record)
+        del records[:-MAX_HISTORY]
+        return record
+
+    def latest(self):
+        return [records[-1] for records in self.history.values() if records]
+
+    def slowest(self, count=10):
+        """ The most recent reload of each library, slowest first """
+        return sorted(self.latest(), key=lambda r: r.seconds, reverse=True)[:count]
+
+    def total(self):
+        return sum(r.seconds for r in self.latest())
+
+    def clear(self):
+        self.history.clear()
+
+    def export(self, filepath):
+        data = {
+            'total_seconds': self.total(),
+            'slowest': [r.path for r in self.slowest(len(self.history))],
+            'history': {path: [r.as_dict() for r in records] for path, records in self.history.items()},
+        }
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+reload_profiler = ReloadProfiler()
@@ -0,0 +1,194 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+# pyright: reportMissingImports=false
+
+"""Rewriting library paths with an ordered list of rules, e.g. after moving an asset server.
+
+A rule is (kind, pattern, replacement): 'PREFIX' rules replace the start of a path, with / and \\ matching
+each other, and 'REGEX' rules substitute the first match of a regular expression. The first rule that matches
+a path decides its new path. Rules are compiled once by RemapRules, then applied to any number of paths.
+
+In the panel, the rules are edited in the Remap Library Paths section. For a whole folder of files, this file
+is also a driver that opens each file in a background Blender, remaps its libraries and saves it:
+
+    python remap.py --blender /path/to/blender --prefix //oldserver/assets/ /mnt/assets/ /projects/shots
+
+Only direct libraries are remapped: the path of an indirect library is stored in the library file linking it,
+so remap the library files too. Like audit.py, this module must stay importable without bpy.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+try:
+    from .audit import REPORT_PREFIX, addon_import_expr, find_blend_files, run_audit
+except ImportError:
+    from audit import REPORT_PREFIX, addon_import_expr, find_blend_files, run_audit  # Running as a script
+
+
+RULE_KINDS = ('PREFIX', 'REGEX')
+
+
+class RemapRules():
+    """ Ordered rewrite rules, compiled once. Raises ValueError for an unknown kind or invalid regular expression """
+
+    def __init__(self, rules):
+        self.rules = []  # (kind, compiled pattern or normalized prefix, replacement)
+        for i, (kind, pattern, replacement) in enumerate(rules):
+            if not pattern:
+                continue
+            if kind == 'PREFIX':
+                self.rules.append((kind, pattern.replace("\\", "/"), replacement))
+            elif kind == 'REGEX':
+                try:
+                    self.rules.append((kind, re.compile(pattern), replacement))
+                except re.error as e:
+                    raise ValueError("Rule {}: invalid regular expression {!r}: {}".format(i + 1, pattern, e))
+            else:
+                raise ValueError("Rule {}: unknown kind {!r}, expected one of {}".format(i + 1, kind, RULE_KINDS))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def apply(self, path):
+        """ New path from the first matching rule, or None if no rule matches or the path wouldn't change """
+        normalized = None
+        for kind, pattern, replacement in self.rules:
+            if kind == 'PREFIX':
+                if normalized is None:
+                    normalized = path.replace("\\", "/")
+                if normalized.startswith(pattern):
+                    new_path = replacement + path[len(pattern):]
+                    return new_path if new_path != path else None
+            else:
+                try:
+                    new_path, n = pattern.subn(replacement, path, count=1)
+                except re.error as e:  # e.g. a replacement referring to a group the pattern doesn't have
+                    raise ValueError("Invalid replacement {!r} for {!r}: {}".format(replacement, pattern.pattern, e))
+                if n:
+                    return new_path if new_path != path else None
+        return None
+
+
+def plan_remap(rules, libraries):
+    """ (library, old path, new path) of each direct library whose path the rules change, and the names of the
+        indirect libraries they would have changed but can't """
+    changes = []
+    indirect = []
+    for lib in libraries:
+        new_path = rules.apply(lib.filepath)
+        if new_path is None:
+            continue
+        if lib.parent is not None:
+            indirect.append(lib.name)
+        else:
+            changes.append((lib, lib.filepath, new_path))
+    return changes, indirect
+
+
+def remap_open_file(rules, dry_run=False):
+    """ Remap the libraries of the file open in Blender and save it, printing what changed as one JSON line.
+        Run inside Blender, e.g. through --python-expr, with rules as a list of (kind, pattern, replacement) """
+    import bpy
+
+    report = {'file': bpy.data.filepath, 'changes': [], 'indirect': [], 'saved': False}
+    try:
+        changes, report['indirect'] = plan_remap(RemapRules(rules), bpy.data.libraries)
+    except ValueError as e:
+        report['error'] = str(e)
+        changes = []
+    for lib, old_path, new_path in changes:
+        report['changes'].append({'library': lib.name, 'old': old_path, 'new': new_path})
+        if not dry_run:
+            lib.filepath = new_path
+    if changes and not dry_run:
+        bpy.ops.wm.save_mainfile()
+        report['saved'] = True
+    print(REPORT_PREFIX + json.dumps(report))
+    sys.stdout.flush()
+
+
+def remap_files(blender, files, rules, jobs, out, dry_run=False, timeout=None, progress=None):
+    """ Remap the files on up to `jobs` Blender instances at once, writing each file's changes to `out` as a JSON
+        line as soon as it's done. Returns the number of failed files """
+    expr = addon_import_expr('remap', "remap_open_file({!r}, {!r})".format([tuple(r) for r in rules], dry_run))
+    return run_audit(blender, files, jobs, out, timeout, progress, expr)
+
+
+class AppendRule(argparse.Action):
+    """ Collects --prefix and --regex options into one list, keeping the order they were given in """
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        rules = getattr(namespace, self.dest) or []
+        rules.append((self.const, values[0], values[1]))
+        setattr(namespace, self.dest, rules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite the library paths of many .blend files")
+    parser.add_argument('paths', nargs='+', help=".blend files, or folders to search for them")
+    parser.add_argument('--prefix', nargs=2, action=AppendRule, const='PREFIX', dest='rules', metavar=('OLD', 'NEW'),
+                        help="Replace paths starting with OLD by NEW. Can be given several times")
+    parser.add_argument('--regex', nargs=2, action=AppendRule, const='REGEX', dest='rules',
+                        metavar=('PATTERN', 'REPLACEMENT'),
+                        help="Substitute the first match of a regular expression. Can be given several times")
+    parser.add_argument('--rules', dest='rules_file',
+                        help="JSON file with a list of [kind, pattern, replacement] rules, applied before the others")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would change, don't save anything")
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', "blender"), help="Blender executable")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="Blender instances to run at once")
+    parser.add_argument('-o', '--output', help="JSON Lines file to write (default: stdout)")
+    parser.add_argument('--timeout', type=float, default=None, help="Seconds to wait for each file")
+    args = parser.parse_args(argv)
+
+    rules = []
+    if args.rules_file:
+        with open(args.rules_file) as f:
+            rules.extend(tuple(rule) for rule in json.load(f))
+    rules.extend(args.rules or [])
+    try:
+        RemapRules(rules)  # Fail before starting Blender hundreds of times
+    except ValueError as e:
+        parser.error(str(e))
+    if not rules:
+        parser.error("no rules given, use --prefix, --regex or --rules")
+
+    files = list(find_blend_files(args.paths))
+
+    def progress(done, total, report):
+        if 'error' in report:
+            status = "FAILED: " + report['error']
+        else:
+            status = "{} librar{} {}".format(len(report['changes']), "y" if len(report['changes']) == 1 else "ies",
+                                             "to remap" if args.dry_run else "remapped")
+        print("[{}/{}] {} - {}".format(done, total, report['file'], status), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            failed = remap_files(args.blender, files, rules, max(1, args.jobs), out, args.dry_run, args.timeout, progress)
+    else:
+        failed = remap_files(args.blender, files, rules, max(1, args.jobs), sys.stdout, args.dry_run, args.timeout,
+                             progress)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""Case-insensitive substring search over many names.
+
+Every character, pair of characters and trigram of each name is indexed. A query of up to three characters is
+looked up directly, a longer one narrows the names down to those containing every trigram of the query before
+checking them. Either way a query matches anywhere in a name, so typing another character never adds results.
+Only the first matches in alphabetical order are sorted, and the last result is kept for redraws.
+"""
+
+import heapq
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex():
+    """ Built once from (name, item) pairs, then searched on every keystroke """
+
+    def __init__(self, entries):
+        self.names = []
+        self.items = []
+        self.grams = {}  # substring of one to three characters -> set of indices into self.names
+        for i, (name, item) in enumerate(entries):
+            name = name.lower()
+            self.names.append(name)
+            self.items.append(item)
+            for gram in {name[j:j + n] for n in (1, 2, 3) for j in range(len(name) - n + 1)}:
+                found = self.grams.get(gram)
+                if found is None:
+                    self.grams[gram] = {i}
+                else:
+                    found.add(i)
+        self.order = sorted(range(len(self.names)), key=self.names.__getitem__)  # Indices in alphabetical order
+        self.rank = [0] * len(self.names)  # Index -> position in self.order
+        for position, i in enumerate(self.order):
+            self.rank[i] = position
+        self.last = None  # (query, limit, results) of the last call to results()
+
+    def __len__(self):
+        return len(self.names)
+
+    def matches(self, query):
+        """ Indices of the names containing the query, in no particular order. Don't modify it, it may be the index's
+            own set """
+        query = query.lower()
+        if not query:
+            return set()
+        if len(query) <= 3:
+            return self.grams.get(query, set())
+
+        candidates = None
+        for trigram in sorted(trigrams(query), key=lambda t: len(self.grams.get(t, ()))):
+            found = self.grams.get(trigram)
+            if not found:
+                return set()
+            candidates = set(found) if candidates is None else candidates & found
+            if not candidates:
+                return set()
+        names = self.names
+        return {i for i in candidates if query in names[i]}
+
+    def first(self, matches, limit=None):
+        """ The first `limit` of the given indices (all of them if None) in alphabetical order, without sorting the
+            rest """
+        if limit is None or limit >= len(matches):
+            return sorted(matches, key=self.rank.__getitem__)
+        if len(matches) * len(matches) > limit * len(self.names):
+            # So many names match that walking them in alphabetical order finds `limit` of them soonest
+            first = []
+            for i in self.order:
+                if i in matches:
+                    first.append(i)
+                    if len(first) == limit:
+                        break
+            return first
+        return heapq.nsmallest(limit, matches, key=self.rank.__getitem__)
+
+    def search(self, query, limit=None):
+        """ Indices of the first `limit` matching names (all of them if None), in alphabetical order """
+        return self.first(self.matches(query), limit)
+
+    def results(self, query, limit=None):
+        """ (number of matches, items of the first `limit` matches). The panel asks again on every redraw, so
+            the last answer is kept """
+        if self.last is not None and self.last[:2] == (query, limit):
+            return self.last[2]
+        matches = self.matches(query)
+        result = (len(matches), [self.items[i] for i in self.first(matches, limit)])
+        self.last = (query, limit, result)
+        return result
@@ -0,0 +1,30 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+import os
+import sys
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The tests here import modules that don't need Blender on their own, but the checkout is itself a package
+# whose __init__ imports bpy, and pytest imports it first. The benchmarks' fake bpy stands in for it
+sys.path.insert(0, ADDON_DIR)
+if 'bpy' not in sys.modules:
+    sys.path.insert(0, os.path.join(ADDON_DIR, "benchmarks"))
+    import fake_bpy
+    fake_bpy.install()
@@ -0,0 +1,210 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+"""blendfile.read_links() on small synthetic .blend files, written here block by block."""
+
+import gzip
+import os
+import struct
+
+import pytest
+
+import blendfile
+
+
+def sdna_block(endian, pointer_size, old_library_name):
+    """ Body of a DNA1 block defining only ID and Library. Before 2.93, Library.name held the path as linked """
+    names = ["*next", "*prev", "name[66]", "id", "filepath[1024]", "name[1024]"]
+    types = ["char", "void", "ID", "Library"]
+    id_size = 2 * pointer_size + 66
+    # (type index, [(field type index, field name index)])
+    structs = [(2, [(1, 0), (1, 1), (0, 2)])]
+    if old_library_name:
+        structs.append((3, [(2, 3), (0, 5), (0, 4)]))
+    else:
+        structs.append((3, [(2, 3), (0, 4)]))
+    library_size = id_size + 1024 * (len(structs[1][1]) - 1)
+
+    out = bytearray()
+
+    def align():
+        out.extend(b"\0" * (-len(out) % 4))
+
+    out += b"SDNANAME" + struct.pack(endian + "i", len(names))
+    for name in names:
+        out += name.encode() + b"\0"
+    align()
+    out += b"TYPE" + struct.pack(endian + "i", len(types))
+    for t in types:
+        out += t.encode() + b"\0"
+    align()
+    out += b"TLEN" + struct.pack(endian + "4h", 1, 0, id_size, library_size)
+    align()
+    out += b"STRC" + struct.pack(endian + "i", len(structs))
+    for type_index, fields in structs:
+        out += struct.pack(endian + "hh", type_index, len(fields))
+        for field in fields:
+            out += struct.pack(endian + "hh", *field)
+    return bytes(out)
+
+
+def id_body(name, pointer_size, size=None):
+    body = b"\0" * (2 * pointer_size) + name.encode().ljust(66, b"\0")
+    return body.ljust(size or len(body), b"\0")
+
+
+def make_blend(libraries, version=293, format_version=0, old_library_name=False, endian="<"):
+    """ An uncompressed .blend file linking the given {library path: [datablock names, with their ID code]} """
+    pointer_size = 8
+    if format_version == 0:
+        header = "BLENDER-{}{:03d}".format("v" if endian == "<" else "V", version).encode()
+        bhead = struct.Struct(endian + "4siQii")
+
+        def block(code, body):
+            return bhead.pack(code, len(body), 0x1000, 0, 1) + body
+    else:
+        header = "BLENDER17-{:02d}{}{:04d}".format(format_version, "v" if endian == "<" else "V", version).encode()
+        bhead = struct.Struct(endian + "4siQqq")
+
+        def block(code, body):
+            return bhead.pack(code, 0, 0x1000, len(body), 1) + body
+
+    id_size = 2 * pointer_size + 66
+    out = bytearray(header)
+    out += block(b"REND", b"\0" * 72)
+    out += block(b"OB\0\0", id_body("OBLocal", pointer_size, 400))  # Local datablock, skipped
+    for path, ids in libraries.items():
+        lib = id_body("LI" + os.path.basename(path), pointer_size)
+        if old_library_name:
+            lib += path.encode().ljust(1024, b"\0") + b"/absolute/elsewhere.blend".ljust(1024, b"\0")
+        else:
+            lib += path.encode().ljust(1024, b"\0")
+        out += block(b"LI\0\0", lib)
+        for name in ids:
+            out += block(b"ID\0\0", id_body(name, pointer_size, id_size))
+    out += block(b"DATA", os.urandom(5000))  # Something big that has to be skipped
+    out += block(b"DNA1", sdna_block(endian, pointer_size, old_library_name))
+    out += block(b"ENDB", b"")
+    return bytes(out)
+
+
+LIBRARIES = {
+    "//props/chair.blend": ["OBChair", "MEChair", "GRChairs"],
+    "/assets/chars/hero.blend": ["OBHero", "GDNotes"],
+}
+
+
+def expected(filepath, version=293):
+    folder = os.path.dirname(os.path.abspath(str(filepath)))
+    return {
+        'file': str(filepath),
+        'libraries': [{
+            'name': "chair.blend",
+            'filepath': "//props/chair.blend",
+            'abspath': os.path.normpath(os.path.join(folder, "props/chair.blend")),
+            'indirect': False,
+            'ids': [{'type': 'Object', 'name': "Chair"}, {'type': 'Mesh', 'name': "Chair"},
+                    {'type': 'Collection', 'name': "Chairs"}],
+        }, {
+            'name': "hero.blend",
+            'filepath': "/assets/chars/hero.blend",
+            'abspath': os.path.normpath("/assets/chars/hero.blend"),
+            'indirect': False,
+            'ids': [{'type': 'Object', 'name': "Hero"},
+                    {'type': 'Annotation' if version >= 500 else 'GreasePencil', 'name': "Notes"}],
+        }],
+    }
+
+
+def write(tmp_path, data, name="shot.blend"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('endian', ["<", ">"], ids=["little", "big"])
+def test_uncompressed(tmp_path, endian):
+    path = write(tmp_path, make_blend(LIBRARIES, endian=endian))
+    assert blendfile.read_links(path) == expected(path)
+
+
+def test_blender_5_header(tmp_path):
+    path = write(tmp_path, make_blend(LIBRARIES, version=500, format_version=1))
+    assert blendfile.read_links(path) == expected(path, version=500)
+
+
+def test_old_library_name(tmp_path):
+    """ Before 2.93, the path as linked was in Library.name, and Library.filepath was made absolute from it """
+    path = write(tmp_path, make_blend(LIBRARIES, version=280, old_library_name=True))
+    assert blendfile.read_links(path) == expected(path, version=280)
+
+
+def test_gzip(tmp_path):
+    path = write(tmp_path, gzip.compress(make_blend(LIBRARIES)))
+    assert blendfile.read_links(path) == expected(path)
+
+
+def test_no_libraries(tmp_path):
+    path = write(tmp_path, make_blend({}))
+    assert blendfile.read_links(path) == {'file': path, 'libraries': []}
+
+
+def test_not_a_blend_file(tmp_path):
+    path = write(tmp_path, b"PNG not a blend file at all")
+    with pytest.raises(blendfile.BlendFileError):
+        blendfile.read_links(path)
+
+
+def test_truncated(tmp_path):
+    data = make_blend(LIBRARIES)
+    path = write(tmp_path, data[:data.index(b"DNA1")])
+    with pytest.raises(blendfile.BlendFileError):
+        blendfile.read_links(path)
+
+
+def seekable_zstd(data, frame_size, zstandard):
+    """ data compressed as independent frames of frame_size bytes, followed by a seek table as Blender writes it """
+    compressor = zstandard.ZstdCompressor()
+    frames = [compressor.compress(data[i:i + frame_size]) for i in range(0, len(data), frame_size)]
+    table = b"".join(struct.pack("<II", len(frame), len(data[i * frame_size:(i + 1) * frame_size]))
+                     for i, frame in enumerate(frames))
+    table += struct.pack("<IBI", len(frames), 0, blendfile.SEEKABLE_MAGIC)
+    return b"".join(frames) + struct.pack("<II", blendfile.SKIPPABLE_MAGIC, len(table)) + table
+
+
+def test_seekable_zstd(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    data = make_blend(LIBRARIES)
+    # Small frames, so that block headers, library blocks and the DNA1 block all span frame boundaries
+    path = write(tmp_path, seekable_zstd(data, 300, zstandard))
+    with open(path, 'rb') as f:
+        reader = blendfile.SeekableZstdReader.open(f, zstandard)
+        assert reader is not None and len(reader.frames) == -(-len(data) // 300)
+        assert reader.read(1000) == data[:1000]  # Spans four frames
+        reader.skip(2000)
+        assert reader.read(700) == data[3000:3700]
+        reader.skip(len(data))
+        assert reader.read(10) == b""
+    assert blendfile.read_links(path) == expected(path)
+
+
+def test_plain_zstd(tmp_path):
+    """ Without a seek table, the file is decompressed as a stream """
+    zstandard = pytest.importorskip("zstandard")
+    path = write(tmp_path, zstandard.ZstdCompressor().compress(make_blend(LIBRARIES)))
+    assert blendfile.read_links(path) == expected(path)
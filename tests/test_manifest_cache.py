@@ -0,0 +1,169 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+import os
+
+import pytest
+
+from manifest_cache import ManifestCache
+
+
+CHAIR = os.path.normpath("/assets/props/chair.blend")
+HERO = os.path.normpath("/assets/chars/hero.blend")
+
+
+class Reader():
+    """ Stands in for blendfile.read_links(), remembering which files it read. Each file links the libraries
+        listed in it, one "library path: datablock names" line each """
+
+    def __init__(self):
+        self.read = []
+
+    def __call__(self, path):
+        self.read.append(path)
+        with open(path) as f:
+            text = f.read()
+        if text == "broken":
+            raise ValueError("Not a .blend file")
+        libraries = []
+        for line in text.splitlines():
+            abspath, _, names = line.partition(":")
+            libraries.append({
+                'name': os.path.basename(abspath),
+                'filepath': abspath,
+                'abspath': abspath,
+                'indirect': False,
+                'ids': [{'type': 'Object', 'name': name} for name in names.split()],
+            })
+        return {'file': path, 'libraries': libraries}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ManifestCache(str(tmp_path / "manifests.db"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def project(tmp_path):
+    folder = tmp_path / "project"
+    (folder / "shots").mkdir(parents=True)
+    files = {
+        'a': folder / "shots" / "a.blend",
+        'b': folder / "shots" / "b.blend",
+        'c': folder / "c.blend",
+    }
+    files['a'].write_text("{}: Chair Table\n{}: Hero".format(CHAIR, HERO))
+    files['b'].write_text("{}: Chair".format(CHAIR))
+    files['c'].write_text("")
+    (folder / "notes.txt").write_text("not a .blend file")
+    return folder, {key: os.path.normpath(str(path)) for key, path in files.items()}
+
+
+def set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_scan_reads_every_file_once(cache, project):
+    folder, files = project
+    reader = Reader()
+    assert cache.scan_folder(str(folder), reader) == (3, 3)
+    assert sorted(reader.read) == sorted(files.values())
+
+    reader = Reader()
+    assert cache.scan_folder(str(folder), reader) == (3, 0)  # Same size and mtime
+    assert reader.read == []
+
+
+def test_scan_reads_changed_files(cache, project):
+    folder, files = project
+    cache.scan_folder(str(folder), Reader())
+
+    set_mtime(files['b'], os.stat(files['b']).st_mtime_ns + 10 ** 9)  # Touched, same size
+    with open(files['c'], 'w') as f:  # Now links a library, bigger
+        f.write("{}: Hero".format(HERO))
+    reader = Reader()
+    assert cache.scan_folder(str(folder), reader) == (3, 2)
+    assert sorted(reader.read) == sorted([files['b'], files['c']])
+    assert [lib['abspath'] for lib in cache.manifest(files['c'])['libraries']] == [HERO]
+
+
+def test_scan_prunes_deleted_files(cache, project):
+    folder, files = project
+    cache.scan_folder(str(folder), Reader())
+    os.remove(files['a'])
+    assert cache.scan_folder(str(folder), Reader()) == (2, 0)
+    assert cache.manifest(files['a']) is None
+    assert set(cache.signatures()) == {files['b'], files['c']}
+
+
+def test_scan_stores_errors(cache, project):
+    folder, files = project
+    with open(files['c'], 'w') as f:
+        f.write("broken")
+    cache.scan_folder(str(folder), Reader())
+    assert cache.manifest(files['c']) == {'file': files['c'], 'error': "Not a .blend file"}
+
+    reader = Reader()
+    cache.scan_folder(str(folder), reader)
+    assert reader.read == []  # Not retried until the file changes
+
+
+def test_invalidate(cache, project):
+    folder, files = project
+    cache.scan_folder(str(folder), Reader())
+    generation = cache.generation
+    cache.invalidate([files['a']])
+    assert cache.generation > generation
+    assert cache.manifest(files['a']) is None
+
+    reader = Reader()
+    assert cache.scan_folder(str(folder), reader) == (3, 1)
+    assert reader.read == [files['a']]
+
+    cache.invalidate()
+    reader = Reader()
+    assert cache.scan_folder(str(folder), reader) == (3, 3)
+
+
+def test_manifest(cache, project):
+    folder, files = project
+    cache.scan_folder(str(folder), Reader())
+    assert cache.manifest(files['a']) == Reader()(files['a'])
+    assert cache.manifest(files['c']) == {'file': files['c'], 'libraries': []}
+    assert cache.is_current(files['a'], (os.stat(files['a']).st_size, os.stat(files['a']).st_mtime_ns))
+
+
+def test_users_of(cache, project):
+    folder, files = project
+    cache.scan_folder(str(folder), Reader())
+    assert cache.users_of(CHAIR) == {files['a']: ["Chair", "Table"], files['b']: ["Chair"]}
+    assert cache.users_of(HERO) == {files['a']: ["Hero"]}
+    assert cache.users_of("/assets/unused.blend") == {}
+
+
+def test_store_replaces(cache):
+    """ What save_post does: store the saved file's direct libraries over what was cached for it """
+    path = os.path.normpath("/project/shot.blend")
+    report = {'file': path, 'libraries': [{'name': "chair.blend", 'filepath': "//chair.blend", 'abspath': CHAIR,
+                                           'indirect': False, 'ids': [{'type': 'Mesh', 'name': "Chair"}]}]}
+    cache.store([(path, (10, 1), report)])
+    cache.store([(path, (20, 2), dict(report, libraries=[]))])
+    assert cache.users_of(CHAIR) == {}
+    assert cache.signatures([path]) == {path: (20, 2)}
@@ -0,0 +1,76 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+from types import SimpleNamespace
+
+import pytest
+
+from remap import RemapRules, plan_remap
+
+
+@pytest.mark.parametrize('path', ["//oldserver/assets/props/chair.blend", "\\\\oldserver\\assets\\props/chair.blend"])
+@pytest.mark.parametrize('prefix', ["//oldserver/assets/", "\\\\oldserver\\assets\\"])
+def test_prefix_either_slash(prefix, path):
+    assert RemapRules([('PREFIX', prefix, "/mnt/assets/")]).apply(path) == "/mnt/assets/props/chair.blend"
+
+
+def test_prefix_no_match():
+    rules = RemapRules([('PREFIX', "//oldserver/", "/mnt/")])
+    assert rules.apply("//otherserver/chair.blend") is None
+    assert rules.apply("/mnt/chair.blend") is None
+
+
+def test_unchanged_path():
+    assert RemapRules([('REGEX', r"chair", "chair")]).apply("//props/chair.blend") is None
+
+
+def test_first_matching_rule_wins():
+    rules = RemapRules([
+        ('PREFIX', "//nowhere/", "/never/"),
+        ('REGEX', r"^//old(\w+)/", r"/mnt/\1/"),
+        ('PREFIX', "//oldserver/", "/second/"),
+    ])
+    assert rules.apply("//oldserver/chair.blend") == "/mnt/server/chair.blend"
+    assert rules.apply("//nowhere/chair.blend") == "/never/chair.blend"
+
+
+def test_empty_patterns_skipped():
+    assert len(RemapRules([('PREFIX', "", "/mnt/"), ('REGEX', "", "x")])) == 0
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError, match="Rule 2: invalid regular expression"):
+        RemapRules([('PREFIX', "//a/", "/b/"), ('REGEX', "(", "")])
+    with pytest.raises(ValueError, match="unknown kind"):
+        RemapRules([('GLOB', "*", "")])
+
+
+def test_invalid_replacement():
+    """ A replacement referring to a group the pattern doesn't have only fails when it's applied """
+    rules = RemapRules([('REGEX', r"//(old)/", r"/\2/")])
+    with pytest.raises(ValueError, match="Invalid replacement"):
+        rules.apply("//old/chair.blend")
+
+
+def test_plan_remap_skips_indirect():
+    direct = SimpleNamespace(name="chair.blend", filepath="//old/chair.blend", parent=None)
+    indirect = SimpleNamespace(name="wood.blend", filepath="//old/wood.blend", parent=direct)
+    other = SimpleNamespace(name="hero.blend", filepath="//chars/hero.blend", parent=None)
+    changes, skipped = plan_remap(RemapRules([('PREFIX', "//old/", "//new/")]), [direct, indirect, other])
+    assert changes == [(direct, "//old/chair.blend", "//new/chair.blend")]
+    assert skipped == ["wood.blend"]
@@ -0,0 +1,66 @@
+# BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# END GPL LICENSE BLOCK #####
+
+import pytest
+
+from search_index import NameIndex
+
+
+NAMES = ["Skinny", "MatSkin", "Kingdom", "body.001", "Body.002", "arm", "SKIN_rig"]
+
+
+def index():
+    return NameIndex((name, name.upper()) for name in NAMES)
+
+
+def brute_force(query):
+    return sorted((name for name in NAMES if query.lower() in name.lower()), key=str.lower)
+
+
+def test_typing_never_adds_results():
+    """ 'ki' used to only match names starting with it, so it found fewer names than 'kin' """
+    names = index()
+    assert names.results("ki") == (4, ["KINGDOM", "MATSKIN", "SKIN_RIG", "SKINNY"])
+    assert names.results("kin") == (4, ["KINGDOM", "MATSKIN", "SKIN_RIG", "SKINNY"])
+    assert names.results("kinn") == (1, ["SKINNY"])
+
+
+@pytest.mark.parametrize('query', ["k", "Y", "in", "od", "ody", "ody.00", "body.002", "_r", "zz", "skinx"])
+def test_matches_substrings(query):
+    assert [NAMES[i] for i in index().search(query)] == brute_force(query)
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_limit(limit):
+    """ The first matches in alphabetical order, whether few or most of the names match """
+    names = index()
+    for query in ("i", "o", "kin"):
+        count, items = names.results(query, limit)
+        assert count == len(brute_force(query))
+        assert items == [name.upper() for name in brute_force(query)[:limit]]
+
+
+def test_empty_query():
+    assert index().results("") == (0, [])
+
+
+def test_last_result_kept():
+    names = index()
+    first = names.results("kin", 2)
+    assert names.results("kin", 2) is first
+    assert names.results("kin", 3) == (4, ["KINGDOM", "MATSKIN", "SKIN_RIG"])